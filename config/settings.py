@@ -57,6 +57,15 @@ class Settings(BaseSettings):
     chroma_persist_directory: str = "./data/chroma"
     chroma_collection_name: str = "fmcg_memory"
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_backend: str = "torch"  # torch, onnx or openvino
+    embedding_model_file: Optional[str] = None  # e.g. onnx/model_qint8_avx512.onnx
+    compile_embedder: bool = False  # torch.compile the transformer (torch backend)
+    memory_index_quantization: str = "int8"  # int8 or fp16
+    embedding_cache_size: int = 2048
+    embedding_batch_size: int = 32
+    embedding_batch_wait_ms: int = 8
+    memory_query_cache_size: int = 512
+    memory_query_cache_ttl: int = 300  # seconds
     
     # Session Management
     session_timeout: int = 1800
@@ -74,6 +83,10 @@ class Settings(BaseSettings):
     agent_timeout: int = 300
     enable_long_running_ops: bool = True
     checkpoint_interval: int = 60
+    simulate_agent_latency_ms: int = 0  # Artificial delay for simulated sub-agents
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_cooldown: int = 30
+    circuit_breaker_half_open_probes: int = 1
     
     # Observability
     enable_tracing: bool = True
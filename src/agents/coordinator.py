@@ -3,9 +3,16 @@ Coordinator Agent
 Main orchestrator for all sub-agents using LLM-powered decision making
 """
 import asyncio
-from typing import Any, Dict, List, Optional
+import time
+import uuid
+from collections import ChainMap
+from contextvars import ContextVar
+from enum import Enum
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence
 from datetime import datetime
-import json
+
+import orjson
 
 from src.models.base import (
     AgentType, AgentStatus, AgentContext, AgentResult,
@@ -25,6 +32,164 @@ from config.settings import get_settings
 settings = get_settings()
 
 
+class CircuitState(str, Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited by an open circuit breaker"""
+
+
+class CircuitBreaker:
+    """
+    Per-agent circuit breaker (closed -> open -> half-open)
+    Fails fast on agents that keep failing instead of re-invoking them
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_half_open_probes = half_open_probes
+        
+        self.state = CircuitState.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.half_open_probes = 0
+    
+    async def call(
+        self,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Any:
+        """Invoke fn through the breaker"""
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(f"Circuit open for agent '{self.name}'")
+            self.state = CircuitState.HALF_OPEN
+            self.half_open_probes = 0
+        
+        is_probe = self.state == CircuitState.HALF_OPEN
+        if is_probe:
+            if self.half_open_probes >= self.max_half_open_probes:
+                raise CircuitOpenError(f"Circuit half-open for agent '{self.name}'")
+            self.half_open_probes += 1
+        
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. by an outer timeout): the probe says nothing
+            # about the agent's health, so hand its slot back
+            if is_probe and self.state == CircuitState.HALF_OPEN:
+                self.half_open_probes -= 1
+            raise
+        
+        self._record_success()
+        return result
+    
+    def _record_failure(self) -> None:
+        """Count a failure and open the circuit when the threshold is hit"""
+        self.failure_count += 1
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.failure_count >= self.failure_threshold
+        ):
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+    
+    def _record_success(self) -> None:
+        """Close the circuit and reset consecutive failures"""
+        self.state = CircuitState.CLOSED
+        self.failure_count = 0
+        self.half_open_probes = 0
+
+
+# One breaker per sub-agent, shared by all coordinator instances
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+# Immutable plan-step templates, shared by every plan that uses them.
+# Steps are read-only; per-call parameters are layered on with ChainMap.
+_ANALYST_STEP = MappingProxyType({
+    "agent": "analyst",
+    "mode": ExecutionMode.PARALLEL,
+    "parameters": MappingProxyType({"analysis_type": "sales"}),
+    "depends_on": ()
+})
+
+_FORECASTER_STEPS = {
+    depends_on: MappingProxyType({
+        "agent": "forecaster",
+        "mode": ExecutionMode.SEQUENTIAL,
+        "parameters": MappingProxyType({"horizon": 30}),
+        "depends_on": depends_on
+    })
+    for depends_on in [(), ("analyst",)]
+}
+
+_REPORTER_STEPS = {
+    depends_on: MappingProxyType({
+        "agent": "reporter",
+        "mode": ExecutionMode.LOOP,
+        "parameters": MappingProxyType({"format": "comprehensive"}),
+        "depends_on": depends_on
+    })
+    for depends_on in [(), ("analyst",), ("forecaster",), ("analyst", "forecaster")]
+}
+
+_DEFAULT_STEP = MappingProxyType({
+    "agent": "analyst",
+    "mode": ExecutionMode.SINGLE,
+    "parameters": MappingProxyType({}),
+    "depends_on": ()
+})
+
+
+# Execution state lives in context variables rather than on the agent, so
+# concurrent execute() calls (one asyncio task each) on a shared
+# coordinator never see each other's plan or step
+_execution_plan_var: ContextVar[Sequence[Mapping[str, Any]]] = ContextVar(
+    "execution_plan", default=()
+)
+_execution_step_var: ContextVar[int] = ContextVar("execution_step", default=0)
+
+
+def _materialize_step(step: Mapping[str, Any]) -> Dict[str, Any]:
+    """Copy a plan step into plain (serializable) containers"""
+    return {
+        **step,
+        "parameters": dict(step["parameters"]),
+        "depends_on": list(step.get("depends_on", ()))
+    }
+
+
+def get_circuit_breaker(agent_name: str) -> CircuitBreaker:
+    """Get (or create) the circuit breaker for an agent"""
+    breaker = _circuit_breakers.get(agent_name)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            agent_name,
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            cooldown=settings.circuit_breaker_cooldown,
+            half_open_probes=settings.circuit_breaker_half_open_probes
+        )
+        _circuit_breakers[agent_name] = breaker
+    return breaker
+
+
 class CoordinatorAgent(LLMAgent):
     """
     Coordinator Agent - LLM-powered orchestration
@@ -49,10 +214,16 @@ class CoordinatorAgent(LLMAgent):
         # Sub-agents registry
         self.sub_agents: Dict[str, LLMAgent] = {}
         self._initialize_sub_agents()
-        
-        # Execution state
-        self.current_execution_step = 0
-        self.execution_plan: List[Dict[str, Any]] = []
+    
+    @property
+    def execution_plan(self) -> Sequence[Mapping[str, Any]]:
+        """Execution plan of the task running in the current context"""
+        return _execution_plan_var.get()
+    
+    @property
+    def current_execution_step(self) -> int:
+        """Plan step being executed in the current context"""
+        return _execution_step_var.get()
         
     def _initialize_sub_agents(self):
         """Initialize all sub-agents"""
@@ -94,14 +265,17 @@ class CoordinatorAgent(LLMAgent):
             execution_plan = await self._create_execution_plan(
                 task, context, memory_context
             )
-            self.execution_plan = execution_plan
+            _execution_plan_var.set(execution_plan)
             
             # 4. Execute plan
             result = await self._execute_plan(execution_plan, context)
             
             # 5. Store in memory
+            result_json = orjson.dumps(
+                result.data, option=orjson.OPT_NON_STR_KEYS
+            ).decode()
             await memory_bank.store(
-                content=f"Task: {task}, Result: {json.dumps(result.data)}",
+                content=f"Task: {task}, Result: {result_json}",
                 metadata={
                     "task": task,
                     "session_id": context.session_id,
@@ -133,7 +307,7 @@ class CoordinatorAgent(LLMAgent):
         task: str,
         context: AgentContext,
         memory_context: List[Dict[str, str]]
-    ) -> List[Dict[str, Any]]:
+    ) -> Sequence[Mapping[str, Any]]:
         """
         Use LLM to create execution plan
         Determines which agents to use and in what order
@@ -171,61 +345,41 @@ Respond with a JSON array of execution steps:
         
         return plan
     
-    async def _rule_based_plan(self, task: str) -> List[Dict[str, Any]]:
+    async def _rule_based_plan(self, task: str) -> Sequence[Mapping[str, Any]]:
         """Create execution plan using rules (simplified)"""
         task_lower = task.lower()
-        plan = []
+        plan: List[Mapping[str, Any]] = []
         
         # Sales analysis task
         if "sales" in task_lower or "revenue" in task_lower or "analyze" in task_lower:
-            plan.append({
-                "agent": "analyst",
-                "mode": ExecutionMode.PARALLEL,
-                "parameters": {"analysis_type": "sales"},
-                "depends_on": []
-            })
+            plan.append(_ANALYST_STEP)
         
         # Forecasting task
         if "forecast" in task_lower or "predict" in task_lower or "future" in task_lower:
-            plan.append({
-                "agent": "forecaster",
-                "mode": ExecutionMode.SEQUENTIAL,
-                "parameters": {"horizon": 30},
-                "depends_on": ["analyst"] if plan else []
-            })
+            plan.append(_FORECASTER_STEPS[("analyst",) if plan else ()])
         
         # Report generation
         if "report" in task_lower or "summary" in task_lower:
-            plan.append({
-                "agent": "reporter",
-                "mode": ExecutionMode.LOOP,
-                "parameters": {"format": "comprehensive"},
-                "depends_on": [step["agent"] for step in plan]
-            })
+            plan.append(_REPORTER_STEPS[tuple(step["agent"] for step in plan)])
         
-        # Customer support
+        # Customer support (only step that carries per-request data)
         if "customer" in task_lower or "support" in task_lower or "question" in task_lower:
             plan.append({
                 "agent": "support",
                 "mode": ExecutionMode.SINGLE,
                 "parameters": {"query": task},
-                "depends_on": []
+                "depends_on": ()
             })
         
         # Default to analysis if no specific task identified
         if not plan:
-            plan.append({
-                "agent": "analyst",
-                "mode": ExecutionMode.SINGLE,
-                "parameters": {},
-                "depends_on": []
-            })
+            plan.append(_DEFAULT_STEP)
         
-        return plan
+        return tuple(plan)
     
     async def _execute_plan(
         self,
-        plan: List[Dict[str, Any]],
+        plan: Sequence[Mapping[str, Any]],
         context: AgentContext
     ) -> AgentResult:
         """Execute the plan with proper mode handling"""
@@ -233,11 +387,11 @@ Respond with a JSON array of execution steps:
         results = {}
         
         for step_idx, step in enumerate(plan):
-            self.current_execution_step = step_idx
+            _execution_step_var.set(step_idx)
             agent_name = step["agent"]
             mode = step["mode"]
             parameters = step["parameters"]
-            depends_on = step.get("depends_on", [])
+            depends_on = step.get("depends_on", ())
             
             # Wait for dependencies
             if depends_on:
@@ -268,7 +422,7 @@ Respond with a JSON array of execution steps:
     async def _execute_parallel(
         self,
         agent_name: str,
-        parameters: Dict[str, Any],
+        parameters: Mapping[str, Any],
         context: AgentContext
     ) -> Dict[str, Any]:
         """Execute agent in parallel mode"""
@@ -277,9 +431,9 @@ Respond with a JSON array of execution steps:
         
         # Create multiple instances or tasks
         for i in range(settings.max_parallel_agents):
-            task = self._simulate_agent_execution(
+            task = self._call_agent(
                 agent_name,
-                {**parameters, "batch_id": i},
+                ChainMap({"batch_id": i}, parameters),
                 context
             )
             tasks.append(task)
@@ -296,7 +450,7 @@ Respond with a JSON array of execution steps:
     async def _execute_sequential(
         self,
         agent_name: str,
-        parameters: Dict[str, Any],
+        parameters: Mapping[str, Any],
         context: AgentContext
     ) -> Dict[str, Any]:
         """Execute agent in sequential mode"""
@@ -306,9 +460,9 @@ Respond with a JSON array of execution steps:
         steps = parameters.get("steps", ["step1", "step2", "step3"])
         
         for step in steps:
-            result = await self._simulate_agent_execution(
+            result = await self._call_agent(
                 agent_name,
-                {**parameters, "current_step": step},
+                ChainMap({"current_step": step}, parameters),
                 context
             )
             results.append(result)
@@ -321,7 +475,7 @@ Respond with a JSON array of execution steps:
     async def _execute_loop(
         self,
         agent_name: str,
-        parameters: Dict[str, Any],
+        parameters: Mapping[str, Any],
         context: AgentContext
     ) -> Dict[str, Any]:
         """Execute agent in loop mode"""
@@ -330,9 +484,9 @@ Respond with a JSON array of execution steps:
         convergence_threshold = parameters.get("threshold", 0.95)
         
         for iteration in range(max_iterations):
-            result = await self._simulate_agent_execution(
+            result = await self._call_agent(
                 agent_name,
-                {**parameters, "iteration": iteration},
+                ChainMap({"iteration": iteration}, parameters),
                 context
             )
             results.append(result)
@@ -351,28 +505,43 @@ Respond with a JSON array of execution steps:
     async def _execute_single(
         self,
         agent_name: str,
-        parameters: Dict[str, Any],
+        parameters: Mapping[str, Any],
         context: AgentContext
     ) -> Dict[str, Any]:
         """Execute agent in single mode"""
-        result = await self._simulate_agent_execution(agent_name, parameters, context)
+        result = await self._call_agent(agent_name, parameters, context)
         
         return {
             "mode": "single",
             "result": result
         }
     
+    async def _call_agent(
+        self,
+        agent_name: str,
+        parameters: Mapping[str, Any],
+        context: AgentContext
+    ) -> Dict[str, Any]:
+        """Run a sub-agent through its circuit breaker"""
+        return await get_circuit_breaker(agent_name).call(
+            self._simulate_agent_execution,
+            agent_name,
+            parameters,
+            context
+        )
+    
     async def _simulate_agent_execution(
         self,
         agent_name: str,
-        parameters: Dict[str, Any],
+        parameters: Mapping[str, Any],
         context: AgentContext
     ) -> Dict[str, Any]:
         """
         Simulate agent execution
         In production, this would call actual sub-agents
         """
-        await asyncio.sleep(0.1)  # Simulate work
+        if settings.simulate_agent_latency_ms:
+            await asyncio.sleep(settings.simulate_agent_latency_ms / 1000)
         
         # Simulate different agent outputs
         if agent_name == "analyst":
@@ -406,7 +575,7 @@ Respond with a JSON array of execution steps:
     
     async def _wait_for_dependencies(
         self,
-        dependencies: List[str],
+        dependencies: Sequence[str],
         results: Dict[str, Any]
     ) -> None:
         """Wait for dependent agents to complete"""
@@ -457,14 +626,18 @@ Respond with a JSON array of execution steps:
         """Get current state for checkpoint"""
         return {
             "status": self.status.value,
-            "execution_plan": self.execution_plan,
+            "execution_plan": [_materialize_step(step) for step in self.execution_plan],
             "current_step": self.current_execution_step
         }
     
+    def _get_execution_step(self) -> int:
+        """Get current execution step for checkpoint"""
+        return self.current_execution_step
+    
     def _restore_state(self, state: Dict[str, Any]) -> None:
         """Restore state from checkpoint"""
-        self.execution_plan = state.get("execution_plan", [])
-        self.current_execution_step = state.get("current_step", 0)
+        _execution_plan_var.set(state.get("execution_plan", ()))
+        _execution_step_var.set(state.get("current_step", 0))
     
     async def _continue_execution(self, step: int) -> AgentResult:
         """Continue execution from specific step"""
@@ -481,17 +654,18 @@ Respond with a JSON array of execution steps:
 # Example usage functions
 async def analyze_sales(
     period: str = "Q4-2024",
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    coordinator: Optional[CoordinatorAgent] = None
 ) -> Dict[str, Any]:
     """Analyze FMCG sales data"""
-    coordinator = CoordinatorAgent()
+    coordinator = coordinator or CoordinatorAgent()
     
     task = f"Analyze sales data for {period}"
     if category:
         task += f" in category {category}"
     
     context = AgentContext(
-        session_id=f"sales_analysis_{datetime.utcnow().timestamp()}",
+        session_id=f"sales_analysis_{uuid.uuid4().hex}",
         metadata={"period": period, "category": category}
     )
     
@@ -501,15 +675,16 @@ async def analyze_sales(
 
 async def forecast_demand(
     product_id: str,
-    horizon_days: int = 30
+    horizon_days: int = 30,
+    coordinator: Optional[CoordinatorAgent] = None
 ) -> Dict[str, Any]:
     """Forecast product demand"""
-    coordinator = CoordinatorAgent()
+    coordinator = coordinator or CoordinatorAgent()
     
     task = f"Forecast demand for product {product_id} for next {horizon_days} days"
     
     context = AgentContext(
-        session_id=f"forecast_{datetime.utcnow().timestamp()}",
+        session_id=f"forecast_{uuid.uuid4().hex}",
         metadata={"product_id": product_id, "horizon": horizon_days}
     )
     
@@ -517,12 +692,15 @@ async def forecast_demand(
     return result.data
 
 
-async def handle_support_query(query: str) -> Dict[str, Any]:
+async def handle_support_query(
+    query: str,
+    coordinator: Optional[CoordinatorAgent] = None
+) -> Dict[str, Any]:
     """Handle customer support query"""
-    coordinator = CoordinatorAgent()
+    coordinator = coordinator or CoordinatorAgent()
     
     context = AgentContext(
-        session_id=f"support_{datetime.utcnow().timestamp()}",
+        session_id=f"support_{uuid.uuid4().hex}",
         metadata={"query_type": "customer_support"}
     )
     
@@ -2,10 +2,14 @@
 Agent Evaluation Framework
 Implements comprehensive evaluation metrics for agent performance
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Collection, Deque, Dict, List, Optional, Sequence, Set, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque
+import asyncio
+import math
+import random
+import time
 import numpy as np
 
 from src.models.base import AgentResult, AgentStatus, AgentType
@@ -39,6 +43,10 @@ class EvaluationMetrics:
     positive_feedback_rate: float = 0.0
     negative_feedback_rate: float = 0.0
     
+    # Running totals over the feedback window
+    _rating_sum: float = field(default=0.0, repr=False)
+    _positive_count: int = field(default=0, repr=False)
+    
     # Resource Metrics
     average_token_usage: float = 0.0
     average_tool_calls: float = 0.0
@@ -59,36 +67,113 @@ class EvaluationMetrics:
                 "total_executions": self.total_executions,
                 "successful_executions": self.successful_executions,
                 "failed_executions": self.failed_executions,
-                "average_response_time": round(self.average_response_time, 3),
-                "p50_response_time": round(self.p50_response_time, 3),
-                "p95_response_time": round(self.p95_response_time, 3),
-                "p99_response_time": round(self.p99_response_time, 3)
+                "average_response_time": self.average_response_time,
+                "p50_response_time": self.p50_response_time,
+                "p95_response_time": self.p95_response_time,
+                "p99_response_time": self.p99_response_time
             },
             "quality": {
-                "accuracy": round(self.accuracy_score, 3),
-                "relevance": round(self.relevance_score, 3),
-                "completeness": round(self.completeness_score, 3),
-                "overall": round(self.overall_quality_score, 3)
+                "accuracy": self.accuracy_score,
+                "relevance": self.relevance_score,
+                "completeness": self.completeness_score,
+                "overall": self.overall_quality_score
             },
             "user_satisfaction": {
-                "score": round(self.user_satisfaction, 3),
-                "positive_rate": round(self.positive_feedback_rate, 3),
-                "negative_rate": round(self.negative_feedback_rate, 3)
+                "score": self.user_satisfaction,
+                "positive_rate": self.positive_feedback_rate,
+                "negative_rate": self.negative_feedback_rate
             },
             "resource_usage": {
-                "avg_token_usage": round(self.average_token_usage, 1),
-                "avg_tool_calls": round(self.average_tool_calls, 1),
-                "cache_hit_rate": round(self.cache_hit_rate, 3)
+                "avg_token_usage": self.average_token_usage,
+                "avg_tool_calls": self.average_tool_calls,
+                "cache_hit_rate": self.cache_hit_rate
             },
             "reliability": {
-                "error_rate": round(self.error_rate, 3),
-                "timeout_rate": round(self.timeout_rate, 3),
-                "retry_rate": round(self.retry_rate, 3)
+                "error_rate": self.error_rate,
+                "timeout_rate": self.timeout_rate,
+                "retry_rate": self.retry_rate
             },
             "last_updated": self.last_updated.isoformat()
         }
 
 
+class LatencySketch:
+    """
+    Streaming quantile sketch (DDSketch-style logarithmic buckets)
+    
+    Quantiles are within `relative_accuracy` of the true value and memory is
+    bounded by the number of occupied buckets, not by the number of samples.
+    Also keeps a running mean.
+    """
+    
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = defaultdict(int)
+        self._zero_count = 0
+        self.count = 0
+        self.mean = 0.0
+    
+    def add(self, value: float) -> None:
+        """Add a sample"""
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        
+        if value <= 0:
+            self._zero_count += 1
+        else:
+            self._buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+    
+    def add_many(self, values: Sequence[float]) -> None:
+        """Add a batch of samples with vectorized bucketing"""
+        samples = np.asarray(values, dtype=np.float64)
+        if samples.size == 0:
+            return
+        
+        self.count += samples.size
+        self.mean += float(samples.sum() - samples.size * self.mean) / self.count
+        
+        positive = samples[samples > 0]
+        self._zero_count += samples.size - positive.size
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+            return_counts=True
+        )
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self._buckets[key] += count
+    
+    def quantile(self, q: float) -> float:
+        """Get the value at quantile q (0 <= q <= 1)"""
+        return self.quantiles((q,))[0]
+    
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """
+        Get the values at several quantiles in a single pass over the buckets
+        Uses nearest rank (no interpolation)
+        """
+        if self.count == 0:
+            return [0.0 for _ in qs]
+        
+        buckets = iter(sorted(self._buckets.items()))
+        seen = self._zero_count
+        value = 0.0
+        values: Dict[float, float] = {}
+        
+        for q in sorted(set(qs)):
+            rank = q * (self.count - 1)
+            while seen <= rank:
+                bucket = next(buckets, None)
+                if bucket is None:
+                    break
+                key, count = bucket
+                seen += count
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+            values[q] = value
+        
+        return [values[q] for q in qs]
+
+
 class AgentEvaluator:
     """
     Evaluates agent performance and quality
@@ -101,8 +186,9 @@ class AgentEvaluator:
     - Comparative analysis
     """
     
-    def __init__(self, sample_rate: float = 0.1):
+    def __init__(self, sample_rate: float = 0.1, flush_interval: float = 0.1):
         self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
         self.logger = get_logger(__name__)
         
         # Storage for metrics by agent type
@@ -110,17 +196,72 @@ class AgentEvaluator:
             EvaluationMetrics
         )
         
-        # Detailed execution history (limited size)
-        self.execution_history: Dict[AgentType, List[Dict[str, Any]]] = defaultdict(
-            lambda: []
-        )
+        # Detailed execution history (bounded ring buffers)
         self.max_history_size = 1000
+        self.execution_history: Dict[AgentType, Deque[Dict[str, Any]]] = defaultdict(
+            lambda: deque(maxlen=self.max_history_size)
+        )
         
-        # Response time tracking for percentiles
-        self.response_times: Dict[AgentType, List[float]] = defaultdict(list)
+        # Response time sketches for mean and percentiles
+        self.response_times: Dict[AgentType, LatencySketch] = defaultdict(
+            LatencySketch
+        )
         
         # User feedback
-        self.feedback: Dict[AgentType, List[Dict[str, Any]]] = defaultdict(list)
+        self.feedback: Dict[AgentType, Deque[Dict[str, Any]]] = defaultdict(
+            lambda: deque(maxlen=self.max_history_size)
+        )
+        
+        # Cached to_dict() output, rebuilt only after an agent's metrics change
+        self._dict_cache: Dict[AgentType, Dict[str, Any]] = {}
+        self._dirty: Set[AgentType] = set()
+        
+        # Pending executions, applied in batches by the background flusher
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+    
+    async def start_flusher(self) -> None:
+        """
+        Start batching recorded executions
+        Until started (or after stopping), executions are applied inline
+        """
+        if self._flusher_task is None or self._flusher_task.done():
+            self._queue = asyncio.Queue()
+            self._flusher_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop_flusher(self) -> None:
+        """Stop the flusher and apply any pending executions"""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        
+        self.flush()
+        self._queue = None
+    
+    async def _flush_loop(self) -> None:
+        """Background loop applying queued executions every flush_interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+    
+    def flush(self) -> None:
+        """Apply all queued executions, one batch per agent type"""
+        if self._queue is None or self._queue.empty():
+            return
+        
+        batches: Dict[AgentType, List[Tuple[AgentResult, Optional[Dict[str, Any]]]]] = (
+            defaultdict(list)
+        )
+        while not self._queue.empty():
+            agent_type, result, details = self._queue.get_nowait()
+            batches[agent_type].append((result, details))
+        
+        for agent_type, batch in batches.items():
+            self._record_batch(agent_type, batch)
     
     def record_execution(
         self,
@@ -128,69 +269,84 @@ class AgentEvaluator:
         result: AgentResult,
         details: Optional[Dict[str, Any]] = None
     ) -> None:
-        """Record agent execution for evaluation"""
-        
+        """
+        Record agent execution for evaluation
+        Execution counts and error rate are always exact. Only a
+        `sample_rate` fraction of executions feeds response times, history
+        and quality scores; while the flusher runs those are applied after
+        the next flush (at most flush_interval later)
+        """
         metrics = self.metrics[agent_type]
         
         # Update execution counts
         metrics.total_executions += 1
-        
         if result.status == AgentStatus.COMPLETED:
             metrics.successful_executions += 1
         elif result.status == AgentStatus.FAILED:
             metrics.failed_executions += 1
         
-        # Update response time
-        self.response_times[agent_type].append(result.execution_time)
-        
-        # Limit response time history
-        if len(self.response_times[agent_type]) > self.max_history_size:
-            self.response_times[agent_type].pop(0)
-        
-        # Calculate average response time
-        metrics.average_response_time = np.mean(
-            self.response_times[agent_type]
-        )
-        
-        # Calculate percentiles
-        if len(self.response_times[agent_type]) >= 10:
-            times = np.array(self.response_times[agent_type])
-            metrics.p50_response_time = np.percentile(times, 50)
-            metrics.p95_response_time = np.percentile(times, 95)
-            metrics.p99_response_time = np.percentile(times, 99)
-        
         # Calculate error rate
-        if metrics.total_executions > 0:
-            metrics.error_rate = (
-                metrics.failed_executions / metrics.total_executions
-            )
+        metrics.error_rate = metrics.failed_executions / metrics.total_executions
+        self._dirty.add(agent_type)
         
-        # Record in history
-        execution_record = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "status": result.status.value,
-            "execution_time": result.execution_time,
-            "data_size": len(str(result.data)),
-            "details": details or {}
-        }
-        
-        self.execution_history[agent_type].append(execution_record)
-        
-        # Limit history size
-        if len(self.execution_history[agent_type]) > self.max_history_size:
-            self.execution_history[agent_type].pop(0)
+        # Drop unsampled executions before any per-event work
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
         
-        # Update quality metrics (if available in result)
-        if result.metrics:
-            self._update_quality_metrics(agent_type, result.metrics)
+        if self._queue is not None:
+            self._queue.put_nowait((agent_type, result, details))
+        else:
+            self._record_batch(agent_type, [(result, details)])
+    
+    def _record_batch(
+        self,
+        agent_type: AgentType,
+        batch: List[Tuple[AgentResult, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """Apply a batch of sampled executions for one agent"""
         
-        metrics.last_updated = datetime.utcnow()
+        metrics = self.metrics[agent_type]
+        sketch = self.response_times[agent_type]
+        history = self.execution_history[agent_type]
+        timestamp = datetime.utcnow()
+        recorded_at = time.time()  # One epoch timestamp for the whole batch
+        
+        # Response times go into the sketch in one vectorized call. Sampling
+        # is uniform, so the sampled mean and quantiles need no reweighting
+        sketch.add_many([result.execution_time for result, _ in batch])
+        
+        for result, details in batch:
+            # Record in history
+            history.append({
+                "timestamp": recorded_at,
+                "status": result.status.value,
+                "execution_time": result.execution_time,
+                "data_size": len(result.data),  # Top-level fields, not serialized size
+                "details": details or {}
+            })
+            
+            # Update quality metrics (if available in result)
+            if result.metrics:
+                self._update_quality_metrics(agent_type, result.metrics)
+        
+        metrics.average_response_time = sketch.mean
+        
+        # Calculate percentiles (once per batch)
+        if sketch.count >= 10:
+            (
+                metrics.p50_response_time,
+                metrics.p95_response_time,
+                metrics.p99_response_time
+            ) = sketch.quantiles((0.5, 0.95, 0.99))
+        
+        metrics.last_updated = timestamp
+        self._dirty.add(agent_type)
         
         self.logger.info(
-            "execution_recorded",
+            "executions_recorded",
             agent_type=agent_type.value,
-            status=result.status.value,
-            execution_time=result.execution_time
+            count=len(batch),
+            average_response_time=metrics.average_response_time
         )
     
     def _update_quality_metrics(
@@ -219,9 +375,10 @@ class AgentEvaluator:
         ]
         
         if any(quality_scores):
-            metrics.overall_quality_score = np.mean([
-                s for s in quality_scores if s > 0
-            ])
+            positive_scores = [s for s in quality_scores if s > 0]
+            metrics.overall_quality_score = (
+                sum(positive_scores) / len(positive_scores)
+            )
     
     def record_feedback(
         self,
@@ -239,14 +396,16 @@ class AgentEvaluator:
             "is_positive": is_positive
         }
         
-        self.feedback[agent_type].append(feedback_record)
-        
-        # Limit feedback history
-        if len(self.feedback[agent_type]) > self.max_history_size:
-            self.feedback[agent_type].pop(0)
+        feedback_list = self.feedback[agent_type]
+        evicted = (
+            feedback_list[0] if len(feedback_list) == feedback_list.maxlen
+            else None
+        )
+        feedback_list.append(feedback_record)
         
         # Update satisfaction metrics
-        self._update_satisfaction_metrics(agent_type)
+        self._update_satisfaction_metrics(agent_type, rating, is_positive, evicted)
+        self._dirty.add(agent_type)
         
         self.logger.info(
             "feedback_recorded",
@@ -255,23 +414,31 @@ class AgentEvaluator:
             is_positive=is_positive
         )
     
-    def _update_satisfaction_metrics(self, agent_type: AgentType) -> None:
-        """Update user satisfaction metrics"""
+    def _update_satisfaction_metrics(
+        self,
+        agent_type: AgentType,
+        rating: float,
+        is_positive: bool,
+        evicted: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Update user satisfaction metrics after a feedback record was appended
+        `evicted` is the record pushed out of the feedback window, if any
+        """
         metrics = self.metrics[agent_type]
         feedback_list = self.feedback[agent_type]
-        
-        if not feedback_list:
-            return
-        
-        # Calculate average satisfaction
-        ratings = [f["rating"] for f in feedback_list]
-        metrics.user_satisfaction = np.mean(ratings)
-        
-        # Calculate feedback rates
         total_feedback = len(feedback_list)
-        positive_count = sum(1 for f in feedback_list if f["is_positive"])
         
-        metrics.positive_feedback_rate = positive_count / total_feedback
+        # Update running totals, dropping the evicted record's share
+        metrics._rating_sum += rating
+        metrics._positive_count += int(is_positive)
+        if evicted is not None:
+            metrics._rating_sum -= evicted["rating"]
+            metrics._positive_count -= int(evicted["is_positive"])
+        
+        # Average satisfaction and feedback rates over the feedback window
+        metrics.user_satisfaction = metrics._rating_sum / total_feedback
+        metrics.positive_feedback_rate = metrics._positive_count / total_feedback
         metrics.negative_feedback_rate = 1 - metrics.positive_feedback_rate
     
     def record_resource_usage(
@@ -284,24 +451,16 @@ class AgentEvaluator:
         """Record resource usage"""
         metrics = self.metrics[agent_type]
         
-        # Update token usage (running average)
+        # Update token usage and tool calls (running averages)
         if metrics.total_executions > 0:
-            total_tokens = (
-                metrics.average_token_usage * (metrics.total_executions - 1) +
-                token_usage
-            )
-            metrics.average_token_usage = total_tokens / metrics.total_executions
+            metrics.average_token_usage += (
+                token_usage - metrics.average_token_usage
+            ) / metrics.total_executions
+            metrics.average_tool_calls += (
+                tool_calls - metrics.average_tool_calls
+            ) / metrics.total_executions
         else:
             metrics.average_token_usage = token_usage
-        
-        # Update tool calls (running average)
-        if metrics.total_executions > 0:
-            total_tools = (
-                metrics.average_tool_calls * (metrics.total_executions - 1) +
-                tool_calls
-            )
-            metrics.average_tool_calls = total_tools / metrics.total_executions
-        else:
             metrics.average_tool_calls = tool_calls
         
         # Update cache hit rate
@@ -310,16 +469,33 @@ class AgentEvaluator:
             metrics.cache_hit_rate = min(1.0, metrics.cache_hit_rate + 0.01)
         else:
             metrics.cache_hit_rate = max(0.0, metrics.cache_hit_rate - 0.001)
+        
+        self._dirty.add(agent_type)
     
     def get_metrics(self, agent_type: AgentType) -> EvaluationMetrics:
         """Get evaluation metrics for an agent"""
         return self.metrics[agent_type]
     
+    def get_metrics_dict(self, agent_type: AgentType) -> Dict[str, Any]:
+        """
+        Get evaluation metrics for an agent as a dictionary
+        The cached copy is reused until the agent records new data, so
+        callers must treat it as read-only
+        """
+        cached = self._dict_cache.get(agent_type)
+        if cached is None or agent_type in self._dirty:
+            cached = self.metrics[agent_type].to_dict()
+            self._dict_cache[agent_type] = cached
+            self._dirty.discard(agent_type)
+        return cached
+    
     def get_all_metrics(self) -> Dict[str, Dict[str, Any]]:
         """Get metrics for all agents"""
+        # Snapshot the keys so agents registered mid-iteration can't break it
+        agent_types = tuple(self.metrics)
         return {
-            agent_type.value: metrics.to_dict()
-            for agent_type, metrics in self.metrics.items()
+            agent_type.value: self.get_metrics_dict(agent_type)
+            for agent_type in agent_types
         }
     
     def compare_agents(
@@ -328,47 +504,47 @@ class AgentEvaluator:
     ) -> Dict[str, Any]:
         """Compare multiple agents"""
         
+        response_time: Dict[str, float] = {}
+        quality_score: Dict[str, float] = {}
+        error_rate: Dict[str, float] = {}
+        best_quality = best_speed = most_reliable = None
+        
+        # Single pass; agents with no recorded data are skipped rather than
+        # created as empty entries in the metrics defaultdict
+        for agent_type in agent_types:
+            metrics = self.metrics.get(agent_type)
+            if metrics is None:
+                continue
+            
+            response_time[agent_type.value] = metrics.average_response_time
+            quality_score[agent_type.value] = metrics.overall_quality_score
+            error_rate[agent_type.value] = metrics.error_rate
+            
+            if best_quality is None or (
+                metrics.overall_quality_score > quality_score[best_quality]
+            ):
+                best_quality = agent_type.value
+            if best_speed is None or (
+                metrics.average_response_time < response_time[best_speed]
+            ):
+                best_speed = agent_type.value
+            if most_reliable is None or (
+                metrics.error_rate < error_rate[most_reliable]
+            ):
+                most_reliable = agent_type.value
+        
         comparison = {
             "agents": agent_types,
-            "metrics": {}
-        }
-        
-        # Performance comparison
-        comparison["metrics"]["response_time"] = {
-            agent_type.value: self.metrics[agent_type].average_response_time
-            for agent_type in agent_types
-        }
-        
-        # Quality comparison
-        comparison["metrics"]["quality_score"] = {
-            agent_type.value: self.metrics[agent_type].overall_quality_score
-            for agent_type in agent_types
-        }
-        
-        # Reliability comparison
-        comparison["metrics"]["error_rate"] = {
-            agent_type.value: self.metrics[agent_type].error_rate
-            for agent_type in agent_types
-        }
-        
-        # Identify best performer
-        best_quality = max(
-            agent_types,
-            key=lambda t: self.metrics[t].overall_quality_score
-        )
-        best_speed = min(
-            agent_types,
-            key=lambda t: self.metrics[t].average_response_time
-        )
-        most_reliable = min(
-            agent_types,
-            key=lambda t: self.metrics[t].error_rate
-        )
-        
-        comparison["best_performers"] = {
-            "highest_quality": best_quality.value,
-            "fastest": best_speed.value,
-            "most_reliable": most_reliable.value
+            "metrics": {
+                "response_time": response_time,
+                "quality_score": quality_score,
+                "error_rate": error_rate
+            },
+            "best_performers": {
+                "highest_quality": best_quality,
+                "fastest": best_speed,
+                "most_reliable": most_reliable
+            }
         }
         
         return comparison
@@ -381,19 +557,20 @@ class AgentEvaluator:
         """Generate performance report"""
         
         metrics = self.metrics[agent_type]
-        history = self.execution_history[agent_type]
         
         # Filter by time window if specified
         if time_window:
-            cutoff = datetime.utcnow() - time_window
+            cutoff = time.time() - time_window.total_seconds()
             history = [
-                h for h in history
-                if datetime.fromisoformat(h["timestamp"]) > cutoff
+                h for h in self.execution_history[agent_type]
+                if h["timestamp"] > cutoff
             ]
+        else:
+            history = self.execution_history[agent_type]
         
         report = {
             "agent_type": agent_type.value,
-            "summary": metrics.to_dict(),
+            "summary": self.get_metrics_dict(agent_type),
             "trends": self._calculate_trends(history),
             "recommendations": self._generate_recommendations(metrics)
         }
@@ -402,21 +579,24 @@ class AgentEvaluator:
     
     def _calculate_trends(
         self,
-        history: List[Dict[str, Any]]
+        history: Collection[Dict[str, Any]]
     ) -> Dict[str, str]:
         """Calculate performance trends"""
         
         if len(history) < 10:
             return {"trend": "insufficient_data"}
         
-        # Split into two halves
-        mid = len(history) // 2
-        first_half = history[:mid]
-        second_half = history[mid:]
+        # Pull the execution time column once, then split into two halves
+        times = np.fromiter(
+            (h["execution_time"] for h in history),
+            dtype=np.float64,
+            count=len(history)
+        )
+        mid = len(times) // 2
         
         # Calculate average response time for each half
-        avg_first = np.mean([h["execution_time"] for h in first_half])
-        avg_second = np.mean([h["execution_time"] for h in second_half])
+        avg_first = times[:mid].mean()
+        avg_second = times[mid:].mean()
         
         # Determine trend
         if avg_second < avg_first * 0.9:
@@ -2,25 +2,32 @@
 Main FastAPI Application
 Implements REST API for the multi-agent system
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
+import asyncio
 import uvicorn
+import uuid
 from datetime import datetime
 
 from config.settings import get_settings
-from src.agents.coordinator import CoordinatorAgent, analyze_sales, forecast_demand, handle_support_query
+from src.agents.coordinator import CircuitOpenError, CoordinatorAgent, analyze_sales, forecast_demand, handle_support_query
 from src.memory.manager import session_service, memory_bank
+from src.evaluation.evaluator import agent_evaluator
 from src.observability.monitor import agent_monitor, get_logger
-from src.models.base import AgentContext, AgentStatus
+from src.models.base import AgentContext, AgentStatus, AgentType
+from src.tools.registry import tool_registry
 
 
 settings = get_settings()
 logger = get_logger(__name__)
 
+# Known failure modes; logged with a short reason instead of a traceback
+EXPECTED_ERRORS = (ValueError, KeyError, asyncio.TimeoutError, CircuitOpenError)
+
 
 # ============================================================================
 # LIFESPAN MANAGEMENT
@@ -35,12 +42,32 @@ async def lifespan(app: FastAPI):
     # Start session cleanup task
     await session_service.start_cleanup_task()
     
+    # Batch evaluation recording off the request path
+    await agent_evaluator.start_flusher()
+    
+    # Shared coordinator, injected into endpoints via get_coordinator
+    app.state.coordinator = CoordinatorAgent()
+    
+    # Bound metric label cardinality to the agents and tools that exist
+    agent_monitor.metrics.register_label_values(
+        agent_types=[agent_type.value for agent_type in AgentType],
+        tool_names=tool_registry.tools.keys()
+    )
+    
     yield
     
     # Shutdown
+    await agent_evaluator.stop_flusher()
+    await tool_registry.aclose()
+    await memory_bank.aclose()
     logger.info("application_shutdown")
 
 
+def get_coordinator(request: Request) -> CoordinatorAgent:
+    """Dependency returning the coordinator created at startup"""
+    return request.app.state.coordinator
+
+
 # ============================================================================
 # APPLICATION SETUP
 # ============================================================================
@@ -124,8 +151,10 @@ async def health_check():
 @app.get("/api/v1/status")
 async def system_status():
     """Get system status"""
-    session_stats = await session_service.get_stats()
-    memory_stats = await memory_bank.get_stats()
+    session_stats, memory_stats = await asyncio.gather(
+        session_service.get_stats(),
+        memory_bank.get_stats()
+    )
     
     return {
         "status": "operational",
@@ -142,7 +171,11 @@ async def system_status():
 # ============================================================================
 
 @app.post("/api/v1/analyze", response_model=AgentResponse)
-async def analyze_data(request: AnalysisRequest, background_tasks: BackgroundTasks):
+async def analyze_data(
+    request: AnalysisRequest,
+    background_tasks: BackgroundTasks,
+    coordinator: CoordinatorAgent = Depends(get_coordinator)
+):
     """
     Analyze FMCG data
     
@@ -152,14 +185,14 @@ async def analyze_data(request: AnalysisRequest, background_tasks: BackgroundTas
     - Memory integration
     """
     try:
-        # Create or get session
-        session_id = request.session_id or f"analysis_{datetime.utcnow().timestamp()}"
-        session = await session_service.get_session(session_id)
-        if not session:
-            session = await session_service.create_session(session_id, request.user_id)
-        
-        # Create coordinator
-        coordinator = CoordinatorAgent()
+        # Create or get session (generated IDs are new, so skip the lookup)
+        if request.session_id:
+            session_id = request.session_id
+            if not await session_service.get_session(session_id):
+                await session_service.create_session(session_id, request.user_id)
+        else:
+            session_id = f"analysis_{uuid.uuid4().hex}"
+            await session_service.create_session(session_id, request.user_id)
         
         # Build task
         task = request.task
@@ -196,13 +229,19 @@ async def analyze_data(request: AnalysisRequest, background_tasks: BackgroundTas
             execution_time=result.execution_time
         )
         
+    except EXPECTED_ERRORS as e:
+        logger.error("analysis_failed", error=str(e), error_type=type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error("analysis_failed", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/v1/forecast", response_model=AgentResponse)
-async def create_forecast(request: ForecastRequest):
+async def create_forecast(
+    request: ForecastRequest,
+    coordinator: CoordinatorAgent = Depends(get_coordinator)
+):
     """
     Generate demand forecast
     
@@ -212,11 +251,12 @@ async def create_forecast(request: ForecastRequest):
     - Predictive modeling
     """
     try:
-        session_id = request.session_id or f"forecast_{datetime.utcnow().timestamp()}"
+        session_id = request.session_id or f"forecast_{uuid.uuid4().hex}"
         
         result_data = await forecast_demand(
             product_id=request.product_id,
-            horizon_days=request.horizon_days
+            horizon_days=request.horizon_days,
+            coordinator=coordinator
         )
         
         return AgentResponse(
@@ -226,13 +266,19 @@ async def create_forecast(request: ForecastRequest):
             execution_time=0.5
         )
         
+    except EXPECTED_ERRORS as e:
+        logger.error("forecast_failed", error=str(e), error_type=type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error("forecast_failed", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/v1/support", response_model=AgentResponse)
-async def customer_support(request: SupportQueryRequest):
+async def customer_support(
+    request: SupportQueryRequest,
+    coordinator: CoordinatorAgent = Depends(get_coordinator)
+):
     """
     Handle customer support query
     
@@ -242,9 +288,9 @@ async def customer_support(request: SupportQueryRequest):
     - Customer interaction patterns
     """
     try:
-        session_id = request.session_id or f"support_{datetime.utcnow().timestamp()}"
+        session_id = request.session_id or f"support_{uuid.uuid4().hex}"
         
-        result_data = await handle_support_query(request.query)
+        result_data = await handle_support_query(request.query, coordinator)
         
         return AgentResponse(
             success=True,
@@ -253,6 +299,9 @@ async def customer_support(request: SupportQueryRequest):
             execution_time=0.3
         )
         
+    except EXPECTED_ERRORS as e:
+        logger.error("support_failed", error=str(e), error_type=type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error("support_failed", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -265,7 +314,7 @@ async def customer_support(request: SupportQueryRequest):
 @app.post("/api/v1/sessions")
 async def create_session(request: SessionCreateRequest):
     """Create a new session"""
-    session_id = f"session_{datetime.utcnow().timestamp()}"
+    session_id = f"session_{uuid.uuid4().hex}"
     session = await session_service.create_session(session_id, request.user_id)
     
     return {
@@ -286,7 +335,7 @@ async def get_session(session_id: str):
         "session_id": session.session_id,
         "user_id": session.user_id,
         "created_at": session.created_at.isoformat(),
-        "last_accessed": session.last_accessed.isoformat(),
+        "last_accessed": session.last_accessed_at.isoformat(),
         "is_active": session.is_active,
         "state": session.state
     }
@@ -401,10 +450,8 @@ async def prometheus_metrics():
 
 
 @app.get("/api/v1/agents/metrics")
-async def agent_metrics():
+async def agent_metrics(coordinator: CoordinatorAgent = Depends(get_coordinator)):
     """Get agent performance metrics"""
-    coordinator = CoordinatorAgent()
-    
     return {
         "coordinator": {
             "total_executions": coordinator.metrics.total_executions,
@@ -421,6 +468,13 @@ async def agent_metrics():
 # ERROR HANDLERS
 # ============================================================================
 
+# Constant part of the 500 payload, built once
+_INTERNAL_ERROR = {
+    "error": "Internal server error",
+    "detail": "An error occurred"
+}
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -431,14 +485,11 @@ async def global_exception_handler(request, exc):
         exc_info=True
     )
     
-    return JSONResponse(
-        status_code=500,
-        content={
-            "error": "Internal server error",
-            "detail": str(exc) if settings.debug else "An error occurred",
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
+    content = dict(_INTERNAL_ERROR, timestamp=datetime.utcnow().isoformat())
+    if settings.debug:
+        content["detail"] = str(exc)
+    
+    return JSONResponse(status_code=500, content=content)
 
 
 # ============================================================================
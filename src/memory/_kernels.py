@@ -0,0 +1,33 @@
+"""
+Similarity kernels for in-process search and re-ranking
+Vectorized numpy over contiguous fp32 arrays
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and values of the k largest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=scores.dtype)
+    
+    # Partial selection is O(n); only the k winners get sorted
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx])]
+    return idx, scores[idx]
+
+
+def cosine_topk(
+    query: np.ndarray,
+    bank: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine similarities of a query against each row of bank
+    Both must be L2-normalized, so similarity is a single matrix-vector product
+    """
+    bank = np.ascontiguousarray(bank, dtype=np.float32)
+    sims = bank @ np.asarray(query, dtype=np.float32)
+    return top_k(sims, k)
@@ -3,22 +3,46 @@ Memory and Session Management System
 Implements long-term memory and session state management
 """
 import asyncio
-from typing import Any, Dict, List, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
 import hashlib
+import heapq
+import re
 
+import numpy as np
+import torch
 from pydantic import BaseModel, Field
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from sentence_transformers import SentenceTransformer
 
+try:
+    import faiss
+except ImportError:  # Optional: the index falls back to an exact float32 scan
+    faiss = None
+
 from config.settings import get_settings
+from src.memory._kernels import cosine_topk, top_k as select_top_k
 
 
 settings = get_settings()
 
+# Upper-case tokens of 3+ characters (SKUs, acronyms) treated as key
+# entities; digits are allowed as long as there is at least one letter
+_ENTITY_RE = re.compile(r"\b(?=\w*[A-Z])[A-Z0-9]{3,}\b")
+
+# Minimum recall@k of the quantized index against an exact FP32 scan
+INDEX_MIN_RECALL = 0.97
+
+
+def _from_epoch(ts: float) -> datetime:
+    """Convert epoch seconds to a naive UTC datetime"""
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
 
 class MemoryEntry(BaseModel):
     """Single memory entry"""
@@ -43,6 +67,337 @@ class SessionState(BaseModel):
     is_active: bool = True
 
 
+@dataclass(slots=True)
+class MemoryRecord:
+    """In-process memory entry; MemoryEntry is the API schema"""
+    id: str
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+    importance: float = 0.5
+    access_count: int = 0
+    last_accessed: float = field(default_factory=time.time)  # Epoch seconds
+    
+    def to_model(self) -> MemoryEntry:
+        """Convert to the API schema"""
+        return MemoryEntry(
+            id=self.id,
+            content=self.content,
+            metadata=self.metadata,
+            timestamp=self.timestamp,
+            importance=self.importance,
+            access_count=self.access_count,
+            last_accessed=_from_epoch(self.last_accessed)
+        )
+
+
+@dataclass(slots=True)
+class SessionRecord:
+    """In-process session state; SessionState is the API schema"""
+    session_id: str
+    user_id: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    last_accessed: float = field(default_factory=time.time)  # Epoch seconds
+    state: Dict[str, Any] = field(default_factory=dict)
+    context: Dict[str, Any] = field(default_factory=dict)
+    is_active: bool = True
+    
+    @property
+    def last_accessed_at(self) -> datetime:
+        """Last access time as a datetime"""
+        return _from_epoch(self.last_accessed)
+    
+    def to_model(self) -> SessionState:
+        """Convert to the API schema"""
+        return SessionState(
+            session_id=self.session_id,
+            user_id=self.user_id,
+            created_at=self.created_at,
+            last_accessed=self.last_accessed_at,
+            state=self.state,
+            context=self.context,
+            is_active=self.is_active
+        )
+
+
+class QuantizedEmbeddingIndex:
+    """
+    In-process embedding index searched by retrieve()
+    With FAISS installed, vectors are held in an IndexScalarQuantizer (int8
+    codes or fp16) and scanned without dequantizing to float32. The int8
+    quantizer is trained on the first TRAIN_SIZE vectors, which are scanned
+    exactly as float32 until then. Without FAISS every vector is kept and
+    scanned as float32
+    """
+    
+    SUPPORTED_QUANTIZATIONS = ("int8", "fp16")
+    TRAIN_SIZE = 1024
+    
+    def __init__(self, quantization: str = "int8"):
+        if quantization not in self.SUPPORTED_QUANTIZATIONS:
+            raise ValueError(
+                f"Quantization must be one of {self.SUPPORTED_QUANTIZATIONS}"
+            )
+        self.quantization = quantization
+        
+        # FAISS tier, built once the quantizer can be trained
+        self._faiss: Optional[Any] = None
+        self._labels: Dict[str, int] = {}
+        self._label_ids: Dict[int, str] = {}
+        self._next_label = 0
+        
+        # Exact float32 tier (before training, or without FAISS)
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._labels)
+    
+    @property
+    def ids(self) -> List[str]:
+        """IDs currently held by the index"""
+        return self._ids + list(self._labels)
+    
+    @staticmethod
+    def _normalize(vector: Any) -> np.ndarray:
+        """Convert to a float32 unit vector"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+    
+    def _reserve(self, size: int, dim: int) -> None:
+        """Grow the exact-tier buffer geometrically to hold `size` rows"""
+        if self._vectors is None:
+            self._vectors = np.empty((max(size, 16), dim), dtype=np.float32)
+        elif size > len(self._vectors):
+            capacity = max(size, 2 * len(self._vectors))
+            vectors = np.empty((capacity, dim), dtype=np.float32)
+            vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+            self._vectors = vectors
+    
+    def _build_faiss(self) -> None:
+        """Train the scalar quantizer and move the exact tier into it"""
+        size = len(self._ids)
+        vectors = self._vectors[:size]
+        qtype = (
+            faiss.ScalarQuantizer.QT_8bit if self.quantization == "int8"
+            else faiss.ScalarQuantizer.QT_fp16
+        )
+        quantizer = faiss.IndexScalarQuantizer(
+            vectors.shape[1], qtype, faiss.METRIC_INNER_PRODUCT
+        )
+        quantizer.train(vectors)
+        self._faiss = faiss.IndexIDMap2(quantizer)
+        self._faiss_add(self._ids, vectors)
+        
+        self._vectors = None
+        self._ids = []
+        self._rows = {}
+    
+    def _faiss_add(self, item_ids: List[str], vectors: np.ndarray) -> None:
+        """Add unit vectors to the FAISS tier under fresh labels"""
+        labels = np.arange(
+            self._next_label, self._next_label + len(item_ids), dtype=np.int64
+        )
+        self._next_label += len(item_ids)
+        for item_id, label in zip(item_ids, labels.tolist()):
+            self._labels[item_id] = label
+            self._label_ids[label] = item_id
+        self._faiss.add_with_ids(np.ascontiguousarray(vectors), labels)
+    
+    def add(self, item_id: str, vector: Any) -> None:
+        """Add or replace the vector for an ID"""
+        vector = self._normalize(vector)
+        self.remove(item_id)
+        
+        if self._faiss is not None:
+            self._faiss_add([item_id], vector[None])
+            return
+        
+        row = len(self._ids)
+        self._reserve(row + 1, vector.shape[0])
+        self._vectors[row] = vector
+        self._ids.append(item_id)
+        self._rows[item_id] = row
+        
+        # fp16 needs no training; int8 waits for a representative sample
+        if faiss is not None and (
+            self.quantization == "fp16" or len(self._ids) >= self.TRAIN_SIZE
+        ):
+            self._build_faiss()
+    
+    def remove(self, item_id: str) -> bool:
+        """Remove an ID"""
+        label = self._labels.pop(item_id, None)
+        if label is not None:
+            del self._label_ids[label]
+            self._faiss.remove_ids(np.array([label], dtype=np.int64))
+            return True
+        
+        # Exact tier: move the last row into the freed slot
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return False
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._vectors[row] = self._vectors[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+        return True
+    
+    def _top(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Unfiltered top-k over whichever tier holds the vectors"""
+        if self._faiss is not None:
+            sims, labels = self._faiss.search(query[None], k)
+            return [
+                (self._label_ids[label], float(sim))
+                for label, sim in zip(labels[0].tolist(), sims[0].tolist())
+                if label >= 0
+            ]
+        
+        sims = self._vectors[:len(self._ids)] @ query
+        top, top_sims = select_top_k(sims, k)
+        return [(self._ids[i], float(sim)) for i, sim in zip(top, top_sims)]
+    
+    def search(
+        self,
+        query: Any,
+        top_k: int = 5,
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Return (id, cosine similarity) pairs for the top_k nearest vectors
+        If accept is given, only IDs it returns True for are kept
+        """
+        size = len(self)
+        if size == 0 or top_k <= 0:
+            return []
+        
+        query = self._normalize(query)
+        
+        # Widen the candidate set until enough of it passes the filter
+        k = min(top_k, size)
+        while True:
+            results = [
+                (item_id, sim) for item_id, sim in self._top(query, k)
+                if accept is None or accept(item_id)
+            ]
+            if len(results) >= top_k or k >= size:
+                return results[:top_k]
+            k = min(2 * k, size)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into batched encode calls
+    Requests arriving within max_wait_ms of each other share one forward pass.
+    The model is not thread-safe, so one batch encodes at a time on a
+    dedicated thread while the next batch is collected
+    """
+    
+    def __init__(self, model: Any, max_batch: int = 32, max_wait_ms: int = 8):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slot: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+    
+    async def submit(self, text: str) -> np.ndarray:
+        """Queue text for the next batch and wait for its embedding"""
+        if self._worker is None or self._worker.done():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="embed"
+                )
+            self._queue = asyncio.Queue()
+            self._slot = asyncio.Semaphore(1)
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode a batch (runs in an executor thread)
+        Returns L2-normalized fp16 vectors, so cosine similarity is a dot product
+        """
+        return self.model.encode(
+            texts,
+            batch_size=self.max_batch,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float16)
+    
+    async def _run(self) -> None:
+        """Background loop draining the queue in batches"""
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                # Give concurrent requests a short window to join the batch
+                if self._queue.qsize() < self.max_batch - 1:
+                    await asyncio.sleep(self.max_wait)
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                
+                # Wait for the encoder, then keep collecting the next batch
+                await self._slot.acquire()
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            task = asyncio.create_task(self._encode_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+    
+    async def _encode_batch(
+        self,
+        batch: List[Tuple[str, asyncio.Future]]
+    ) -> None:
+        """Encode one batch off the event loop and resolve its futures"""
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = await loop.run_in_executor(
+                self._executor, self._encode, texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slot.release()
+        
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+    
+    async def aclose(self) -> None:
+        """
+        Stop the batch loop and the encode thread; restarts on next submit
+        A batch already encoding finishes; queued requests are cancelled
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(
+                self._worker, *self._in_flight, return_exceptions=True
+            )
+            self._worker = None
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
 class MemoryBank:
     """
     Long-term memory storage with vector similarity search
@@ -67,21 +422,147 @@ class MemoryBank:
         )
         
         # Initialize embedding model
-        self.embedding_model = SentenceTransformer(
-            self.settings.embedding_model
+        self.embedding_model = self._load_embedding_model()
+        
+        # Groups concurrent encode calls into one forward pass
+        self.embedding_batcher = EmbeddingBatcher(
+            self.embedding_model,
+            max_batch=self.settings.embedding_batch_size,
+            max_wait_ms=self.settings.embedding_batch_wait_ms
         )
         
-        self.memories: Dict[str, MemoryEntry] = {}
+        # Quantized copy of the embeddings that retrieve() searches
+        self.embedding_index = QuantizedEmbeddingIndex(
+            self.settings.memory_index_quantization
+        )
+        
+        # LRU of recent embeddings, keyed by content digest
+        self._embedding_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        
+        # LRU of recent retrieve() results: (query digest, top_k,
+        # min_importance) -> (memory IDs, expiry). Cleared on every write
+        self._query_cache: "OrderedDict[Tuple[bytes, int, float], Tuple[List[str], float]]" = (
+            OrderedDict()
+        )
+        self._query_hits = 0
+        self._query_misses = 0
+        
+        self.memories: Dict[str, MemoryRecord] = {}
+        
+        # Struct-of-arrays copy of the scanned fields, one row per memory,
+        # so cleanup and stats are vectorized instead of walking entries
+        self._row_ids: List[str] = []
+        self._id_to_idx: Dict[str, int] = {}
+        self._ts = np.empty(0, dtype="datetime64[us]")
+        self._importance = np.empty(0, dtype=np.float64)
+        self._access = np.empty(0, dtype=np.int32)
+        
+        # Min-heap of (timestamp, id) so cleanup only visits stale memories.
+        # Entries for deleted or still-important memories are dropped lazily.
+        # _expiry_queued holds the IDs with a live entry, so each memory has
+        # at most one; a memory's timestamp never changes, so neither does
+        # its key
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        self._expiry_queued: Set[str] = set()
+    
+    def _add_row(self, memory: MemoryRecord) -> None:
+        """Append a memory's scanned fields, growing the arrays geometrically"""
+        row = len(self._row_ids)
+        if row == len(self._ts):
+            capacity = max(16, 2 * row)
+            self._ts = np.resize(self._ts, capacity)
+            self._importance = np.resize(self._importance, capacity)
+            self._access = np.resize(self._access, capacity)
+        
+        self._ts[row] = np.datetime64(memory.timestamp, "us")
+        self._importance[row] = memory.importance
+        self._access[row] = memory.access_count
+        self._row_ids.append(memory.id)
+        self._id_to_idx[memory.id] = row
+    
+    def _remove_row(self, memory_id: str) -> None:
+        """Remove a memory's row, moving the last row into its slot"""
+        row = self._id_to_idx.pop(memory_id)
+        last = len(self._row_ids) - 1
+        if row != last:
+            moved_id = self._row_ids[last]
+            self._ts[row] = self._ts[last]
+            self._importance[row] = self._importance[last]
+            self._access[row] = self._access[last]
+            self._row_ids[row] = moved_id
+            self._id_to_idx[moved_id] = row
+        self._row_ids.pop()
+    
+    def _load_embedding_model(self) -> SentenceTransformer:
+        """
+        Load the embedding model on the configured backend
+        onnx/openvino need sentence-transformers >= 3.2 and the matching runtime
+        """
+        backend = self.settings.embedding_backend
+        if backend == "torch":
+            model = SentenceTransformer(self.settings.embedding_model)
+            if self.settings.compile_embedder:
+                self._compile_embedder(model)
+            return model
+        
+        model_kwargs = {}
+        if self.settings.embedding_model_file:
+            model_kwargs["file_name"] = self.settings.embedding_model_file
+        return SentenceTransformer(
+            self.settings.embedding_model,
+            backend=backend,
+            model_kwargs=model_kwargs
+        )
+    
+    @staticmethod
+    def _compile_embedder(model: SentenceTransformer) -> None:
+        """
+        Compile the underlying transformer with torch.compile and warm it up,
+        so the first real request doesn't pay the compilation cost
+        """
+        transformer = model[0]
+        transformer.auto_model = torch.compile(
+            transformer.auto_model, dynamic=True
+        )
+        model.encode(["warm-up"], convert_to_numpy=True)
     
     def _generate_id(self, content: str) -> str:
         """Generate unique ID for memory entry"""
-        return hashlib.sha256(
-            f"{content}{datetime.utcnow().isoformat()}".encode()
-        ).hexdigest()[:16]
+        return hashlib.blake2b(
+            f"{content}{datetime.utcnow().isoformat()}".encode(),
+            digest_size=8
+        ).hexdigest()
+    
+    async def _generate_embedding(self, content: str) -> np.ndarray:
+        """Generate embedding for content, reusing cached results"""
+        key = hashlib.blake2b(content.encode(), digest_size=16).digest()
+        embedding = self._embedding_cache.get(key)
+        if embedding is not None:
+            self._embedding_cache.move_to_end(key)
+            self._cache_hits += 1
+            return embedding
+        
+        self._cache_misses += 1
+        embedding = await self.embedding_batcher.submit(content)
+        embedding.setflags(write=False)  # Shared by every caller hitting the cache
+        
+        self._embedding_cache[key] = embedding
+        if len(self._embedding_cache) > self.settings.embedding_cache_size:
+            self._embedding_cache.popitem(last=False)
+        return embedding
     
-    def _generate_embedding(self, content: str) -> List[float]:
-        """Generate embedding for content"""
-        return self.embedding_model.encode(content).tolist()
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get embedding cache statistics"""
+        lookups = self._cache_hits + self._cache_misses
+        return {
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "hit_rate": self._cache_hits / lookups if lookups else 0.0,
+            "size": len(self._embedding_cache),
+            "max_size": self.settings.embedding_cache_size
+        }
     
     async def store(
         self,
@@ -90,57 +571,113 @@ class MemoryBank:
         importance: float = 0.5
     ) -> str:
         """Store new memory"""
-        memory_id = self._generate_id(content)
-        embedding = self._generate_embedding(content)
-        
-        memory = MemoryEntry(
-            id=memory_id,
-            content=content,
-            metadata=metadata or {},
-            embedding=embedding,
-            importance=importance
-        )
+        memory_ids = await self.store_many([(content, metadata, importance)])
+        return memory_ids[0]
+    
+    async def store_many(
+        self,
+        items: List[Tuple[str, Optional[Dict[str, Any]], float]]
+    ) -> List[str]:
+        """
+        Store several memories with a single ChromaDB insert
+        Items are (content, metadata, importance) tuples; returns their IDs
+        """
+        if not items:
+            return []
         
-        # Store in ChromaDB
-        meta_dict = metadata or {}
-        meta_dict.update({
-            "importance": importance,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        # Embed each distinct content once; cache misses are coalesced into
+        # batched forward passes
+        contents = list(dict.fromkeys(content for content, _, _ in items))
+        vectors = dict(zip(contents, await asyncio.gather(
+            *(self._generate_embedding(content) for content in contents)
+        )))
+        embeddings = [vectors[content] for content, _, _ in items]
+        
+        memories = []
+        metadatas = []
+        for position, (content, metadata, importance) in enumerate(items):
+            memory = MemoryRecord(
+                # Position keeps IDs unique for equal contents in one call
+                id=self._generate_id(f"{position}:{content}"),
+                content=content,
+                metadata=metadata or {},
+                importance=importance
+            )
+            memories.append(memory)
+            metadatas.append({
+                **(metadata or {}),
+                "importance": importance,
+                "timestamp": memory.timestamp.isoformat()
+            })
         
+        # Store in ChromaDB
+        self._query_cache.clear()
         self.collection.add(
-            ids=[memory_id],
-            embeddings=[embedding],
-            documents=[content],
-            metadatas=[meta_dict]
+            ids=[memory.id for memory in memories],
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            documents=[memory.content for memory in memories],
+            metadatas=metadatas
         )
         
-        self.memories[memory_id] = memory
-        return memory_id
+        for memory, embedding in zip(memories, embeddings):
+            self.embedding_index.add(memory.id, embedding)
+            self.memories[memory.id] = memory
+            self._add_row(memory)
+            heapq.heappush(self._expiry_heap, (memory.timestamp, memory.id))
+            self._expiry_queued.add(memory.id)
+        
+        return [memory.id for memory in memories]
     
     async def retrieve(
         self,
         query: str,
         top_k: int = 5,
         min_importance: float = 0.0
-    ) -> List[MemoryEntry]:
+    ) -> List[MemoryRecord]:
         """Retrieve relevant memories using similarity search"""
-        query_embedding = self._generate_embedding(query)
-        
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where={"importance": {"$gte": min_importance}}
+        key = (
+            hashlib.blake2b(query.encode(), digest_size=16).digest(),
+            top_k,
+            min_importance
         )
+        now = time.time()
+        cached = self._query_cache.get(key)
+        
+        if cached is not None and cached[1] > now:
+            self._query_cache.move_to_end(key)
+            self._query_hits += 1
+            memory_ids = cached[0]
+        else:
+            self._query_misses += 1
+            query_embedding = await self._generate_embedding(query)
+            
+            # Every live memory is in the quantized index, so search it
+            # in-process rather than round-tripping through ChromaDB
+            accept = None
+            if min_importance > 0:
+                accept = lambda memory_id: (
+                    self.memories[memory_id].importance >= min_importance
+                )
+            memory_ids = [
+                memory_id for memory_id, _ in
+                self.embedding_index.search(query_embedding, top_k, accept)
+            ]
+            
+            self._query_cache[key] = (
+                memory_ids, now + self.settings.memory_query_cache_ttl
+            )
+            self._query_cache.move_to_end(key)
+            if len(self._query_cache) > self.settings.memory_query_cache_size:
+                self._query_cache.popitem(last=False)
         
         memories = []
-        if results['ids']:
-            for i, memory_id in enumerate(results['ids'][0]):
-                if memory_id in self.memories:
-                    memory = self.memories[memory_id]
-                    memory.access_count += 1
-                    memory.last_accessed = datetime.utcnow()
-                    memories.append(memory)
+        for memory_id in memory_ids:
+            if memory_id in self.memories:
+                memory = self.memories[memory_id]
+                memory.access_count += 1
+                memory.last_accessed = now
+                self._access[self._id_to_idx[memory_id]] += 1
+                memories.append(memory)
         
         return memories
     
@@ -156,22 +693,32 @@ class MemoryBank:
             return False
         
         memory = self.memories[memory_id]
+        embedding = None
         
-        if content:
+        # Only re-embed when the content actually changes
+        content_changed = bool(content) and content != memory.content
+        if content_changed:
             memory.content = content
-            memory.embedding = self._generate_embedding(content)
+            embedding = await self._generate_embedding(content)
+            self.embedding_index.add(memory_id, embedding)
         
         if metadata:
             memory.metadata.update(metadata)
         
         if importance is not None:
             memory.importance = importance
+            self._importance[self._id_to_idx[memory_id]] = importance
+            if importance < 0.7 and memory_id not in self._expiry_queued:
+                # Make it eligible for cleanup again if a past pass dropped it
+                heapq.heappush(self._expiry_heap, (memory.timestamp, memory_id))
+                self._expiry_queued.add(memory_id)
         
         # Update in ChromaDB
+        self._query_cache.clear()
         self.collection.update(
             ids=[memory_id],
-            embeddings=[memory.embedding] if content else None,
-            documents=[content] if content else None,
+            embeddings=[embedding.tolist()] if content_changed else None,
+            documents=[content] if content_changed else None,
             metadatas=[{
                 **memory.metadata,
                 "importance": memory.importance,
@@ -186,39 +733,110 @@ class MemoryBank:
         if memory_id not in self.memories:
             return False
         
+        self._query_cache.clear()
         self.collection.delete(ids=[memory_id])
+        self.embedding_index.remove(memory_id)
+        self._remove_row(memory_id)
         del self.memories[memory_id]
         return True
     
+    async def audit_index_recall(
+        self,
+        queries: List[str],
+        top_k: int = 5
+    ) -> float:
+        """
+        Measure recall@k of the quantized index against an exact FP32 scan
+        of the embeddings held by ChromaDB. If an int8 index falls below
+        INDEX_MIN_RECALL, it is rebuilt as fp16 from those embeddings.
+        """
+        if not queries or len(self.embedding_index) == 0:
+            return 1.0
+        
+        stored = self.collection.get(
+            ids=self.embedding_index.ids,
+            include=["embeddings"]
+        )
+        ids = stored["ids"]
+        matrix = np.asarray(stored["embeddings"], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms > 0, norms, 1.0)
+        k = min(top_k, len(ids))
+        
+        hits = 0
+        for query in queries:
+            query_embedding = await self._generate_embedding(query)
+            exact_top, _ = cosine_topk(
+                QuantizedEmbeddingIndex._normalize(query_embedding), matrix, k
+            )
+            exact = {ids[i] for i in exact_top}
+            approx = {
+                memory_id
+                for memory_id, _ in self.embedding_index.search(query_embedding, k)
+            }
+            hits += len(exact & approx)
+        
+        recall = hits / (k * len(queries))
+        if recall < INDEX_MIN_RECALL and self.embedding_index.quantization == "int8":
+            index = QuantizedEmbeddingIndex("fp16")
+            for memory_id, vector in zip(ids, matrix):
+                index.add(memory_id, vector)
+            self.embedding_index = index
+            self._query_cache.clear()
+        
+        return recall
+    
     async def cleanup_old_memories(self, days: int = 90) -> int:
         """Remove memories older than specified days"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         deleted_count = 0
         
-        for memory_id, memory in list(self.memories.items()):
-            if memory.timestamp < cutoff_date and memory.importance < 0.7:
+        # Pop only entries older than the cutoff; the heap top is the oldest
+        heap = self._expiry_heap
+        while heap and heap[0][0] < cutoff_date:
+            _, memory_id = heapq.heappop(heap)
+            self._expiry_queued.discard(memory_id)
+            memory = self.memories.get(memory_id)
+            if memory is not None and memory.importance < 0.7:
                 await self.delete(memory_id)
                 deleted_count += 1
         
         return deleted_count
     
+    async def aclose(self) -> None:
+        """Stop background embedding work"""
+        await self.embedding_batcher.aclose()
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Get memory bank statistics"""
+        lookups = self._query_hits + self._query_misses
+        query_cache = {
+            "hits": self._query_hits,
+            "misses": self._query_misses,
+            "hit_rate": self._query_hits / lookups if lookups else 0.0,
+            "size": len(self._query_cache)
+        }
+        
+        size = len(self._row_ids)
+        if size == 0:
+            return {
+                "total_memories": 0,
+                "average_importance": 0,
+                "most_accessed": None,
+                "oldest_memory": None,
+                "query_cache": query_cache
+            }
+        
         return {
-            "total_memories": len(self.memories),
-            "average_importance": sum(
-                m.importance for m in self.memories.values()
-            ) / len(self.memories) if self.memories else 0,
-            "most_accessed": max(
-                self.memories.values(),
-                key=lambda m: m.access_count,
-                default=None
-            ),
-            "oldest_memory": min(
-                self.memories.values(),
-                key=lambda m: m.timestamp,
-                default=None
-            )
+            "total_memories": size,
+            "average_importance": float(self._importance[:size].mean()),
+            "most_accessed": self.memories[
+                self._row_ids[int(self._access[:size].argmax())]
+            ].to_model(),
+            "oldest_memory": self.memories[
+                self._row_ids[int(self._ts[:size].argmin())]
+            ].to_model(),
+            "query_cache": query_cache
         }
 
 
@@ -226,31 +844,42 @@ class InMemorySessionService:
     """
     In-memory session management service
     Handles session state for pause/resume functionality
+    
+    Sessions are kept in least-recently-accessed order, so expiry only
+    visits expired sessions. State is per process: methods never await
+    between reading and writing it, so they are atomic on the event loop,
+    and each uvicorn worker holds its own independent sessions.
     """
     
     def __init__(self):
-        self.sessions: Dict[str, SessionState] = {}
+        self.sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
         self.settings = get_settings()
         self._cleanup_task: Optional[asyncio.Task] = None
     
+    def _touch(self, session: SessionRecord) -> None:
+        """Mark a session as accessed now and move it to the back"""
+        session.last_accessed = time.time()
+        self.sessions.move_to_end(session.session_id)
+    
     async def create_session(
         self,
         session_id: str,
         user_id: Optional[str] = None
-    ) -> SessionState:
+    ) -> SessionRecord:
         """Create new session"""
-        session = SessionState(
+        session = SessionRecord(
             session_id=session_id,
             user_id=user_id
         )
         self.sessions[session_id] = session
+        self._touch(session)
         return session
     
-    async def get_session(self, session_id: str) -> Optional[SessionState]:
+    async def get_session(self, session_id: str) -> Optional[SessionRecord]:
         """Get existing session"""
         session = self.sessions.get(session_id)
         if session:
-            session.last_accessed = datetime.utcnow()
+            self._touch(session)
         return session
     
     async def update_session(
@@ -269,7 +898,7 @@ class InMemorySessionService:
         if context:
             session.context.update(context)
         
-        session.last_accessed = datetime.utcnow()
+        self._touch(session)
         return True
     
     async def delete_session(self, session_id: str) -> bool:
@@ -281,14 +910,16 @@ class InMemorySessionService:
     
     async def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions"""
-        timeout = timedelta(seconds=self.settings.session_timeout)
-        cutoff_time = datetime.utcnow() - timeout
+        cutoff_time = time.time() - self.settings.session_timeout
         deleted_count = 0
         
-        for session_id, session in list(self.sessions.items()):
-            if session.last_accessed < cutoff_time:
-                await self.delete_session(session_id)
-                deleted_count += 1
+        # Oldest sessions are at the front; stop at the first fresh one
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_accessed >= cutoff_time:
+                break
+            await self.delete_session(session.session_id)
+            deleted_count += 1
         
         return deleted_count
     
@@ -335,18 +966,22 @@ class ContextCompactor:
         if target_size is None:
             target_size = self.max_size
         
-        # Calculate current size (rough estimate)
-        current_size = sum(
-            len(json.dumps(msg)) for msg in context
-        )
-        
-        if current_size <= target_size:
-            return context
-        
         # Strategy: Keep first and last messages, summarize middle
+        # (nothing to summarize with three messages or fewer)
         if len(context) <= 3:
             return context
         
+        # Calculate current size (rough estimate: field lengths plus a
+        # constant per-message allowance for JSON keys and quoting),
+        # stopping as soon as the budget is exceeded
+        current_size = 0
+        for msg in context:
+            current_size += len(msg.get("content", "")) + len(msg.get("role", "")) + 16
+            if current_size > target_size:
+                break
+        else:
+            return context
+        
         compacted = [
             context[0],  # Keep first message
             {
@@ -363,16 +998,13 @@ class ContextCompactor:
         context: List[Dict[str, str]]
     ) -> Dict[str, Any]:
         """Extract key information from context"""
-        key_entities = set()
         key_topics = set()
         
-        for msg in context:
-            content = msg.get("content", "")
-            # Simple extraction (can be enhanced with NLP)
-            words = content.split()
-            for word in words:
-                if word.isupper() and len(word) > 2:
-                    key_entities.add(word)
+        # Simple extraction (can be enhanced with NLP): one regex pass
+        # over all message contents
+        key_entities = set(_ENTITY_RE.findall(
+            " ".join(msg.get("content", "") for msg in context)
+        ))
         
         return {
             "entities": list(key_entities),
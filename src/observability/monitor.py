@@ -3,9 +3,10 @@ Observability System
 Implements logging, tracing, and metrics collection
 Using OpenTelemetry, Prometheus, and structured logging
 """
+import logging
 import time
 import structlog
-from typing import Any, Dict, Optional, Callable
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
 from functools import wraps
 from datetime import datetime
 from contextlib import contextmanager
@@ -68,6 +69,8 @@ class TracingManager:
         self._setup_tracing()
         self.tracer = trace.get_tracer(__name__)
         self.logger = get_logger(__name__)
+        # stdlib logger behind structlog, used to gate per-span debug events
+        self._stdlib_logger = logging.getLogger(__name__)
     
     def _setup_tracing(self):
         """Setup OpenTelemetry tracing"""
@@ -108,11 +111,15 @@ class TracingManager:
                 for key, value in attributes.items():
                     span.set_attribute(key, str(value))
             
-            self.logger.info(
-                "span_started",
-                span_name=name,
-                trace_id=format(span.get_span_context().trace_id, '032x')
-            )
+            # Per-span events are debug-only; the trace id is formatted once
+            debug = self._stdlib_logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                trace_id = f"{span.get_span_context().trace_id:032x}"
+                self.logger.debug(
+                    "span_started",
+                    span_name=name,
+                    trace_id=trace_id
+                )
             
             try:
                 yield span
@@ -126,18 +133,23 @@ class TracingManager:
                 )
                 raise
             finally:
-                self.logger.info(
-                    "span_completed",
-                    span_name=name
-                )
+                if debug:
+                    self.logger.debug(
+                        "span_completed",
+                        span_name=name,
+                        trace_id=trace_id
+                    )
     
     def trace_async(self, span_name: Optional[str] = None):
         """Decorator for tracing async functions"""
         def decorator(func: Callable):
+            # Resolved once at decoration time, not on every call
+            name = span_name or f"{func.__module__}.{func.__name__}"
+            attributes = {"function": func.__name__}
+            
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                name = span_name or f"{func.__module__}.{func.__name__}"
-                with self.start_span(name, {"function": func.__name__}):
+                with self.start_span(name, attributes):
                     return await func(*args, **kwargs)
             return wrapper
         return decorator
@@ -145,10 +157,13 @@ class TracingManager:
     def trace_sync(self, span_name: Optional[str] = None):
         """Decorator for tracing sync functions"""
         def decorator(func: Callable):
+            # Resolved once at decoration time, not on every call
+            name = span_name or f"{func.__module__}.{func.__name__}"
+            attributes = {"function": func.__name__}
+            
             @wraps(func)
             def wrapper(*args, **kwargs):
-                name = span_name or f"{func.__module__}.{func.__name__}"
-                with self.start_span(name, {"function": func.__name__}):
+                with self.start_span(name, attributes):
                     return func(*args, **kwargs)
             return wrapper
         return decorator
@@ -159,14 +174,51 @@ class TracingManager:
 # ============================================================================
 
 class MetricsCollector:
-    """Collects and exports metrics using Prometheus"""
+    """
+    Collects and exports metrics using Prometheus
+    Label values outside the registered sets are collapsed to "other" so
+    unexpected agents, tools or exception types can't add time series.
+    Callers normalize agent types and tool names once with agent_label() /
+    tool_label(); the record methods take those labels as-is
+    """
+    
+    OTHER_LABEL = "other"
+    
+    _KNOWN_ERRORS: FrozenSet[str] = frozenset({
+        "ValueError", "KeyError", "TypeError", "AttributeError",
+        "RuntimeError", "TimeoutError", "CancelledError", "ConnectionError",
+        "HTTPError", "HTTPStatusError", "HTTPException", "ValidationError",
+        "CircuitOpenError"
+    })
     
     def __init__(self):
         self.settings = get_settings()
         self.logger = get_logger(__name__)
+        # Unrestricted until register_label_values() runs at startup
+        self._known_agents: Optional[FrozenSet[str]] = None
+        self._known_tools: Optional[FrozenSet[str]] = None
         self._setup_metrics()
         self._define_metrics()
     
+    def register_label_values(
+        self,
+        agent_types: Iterable[str],
+        tool_names: Iterable[str]
+    ) -> None:
+        """Set the agent types and tool names allowed as label values"""
+        self._known_agents = frozenset(agent_types)
+        self._known_tools = frozenset(tool_names)
+    
+    def agent_label(self, agent_type: str) -> str:
+        """Agent type label value, or "other" if not registered"""
+        known = self._known_agents
+        return agent_type if known is None or agent_type in known else self.OTHER_LABEL
+    
+    def tool_label(self, tool_name: str) -> str:
+        """Tool name label value, or "other" if not registered"""
+        known = self._known_tools
+        return tool_name if known is None or tool_name in known else self.OTHER_LABEL
+    
     def _setup_metrics(self):
         """Setup Prometheus metrics collection"""
         if not self.settings.enable_metrics:
@@ -211,7 +263,7 @@ class MetricsCollector:
             'agent_request_duration_seconds',
             'Request duration in seconds',
             ['agent_type'],
-            buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+            buckets=[0.5, 2.0, 10.0, 30.0]
         )
         
         # Agent metrics
@@ -237,7 +289,8 @@ class MetricsCollector:
         self.tool_duration = Histogram(
             'tool_execution_duration_seconds',
             'Tool execution duration',
-            ['tool_name']
+            ['tool_name'],
+            buckets=[0.05, 0.5, 2.0, 10.0]
         )
         
         # Memory metrics
@@ -256,55 +309,86 @@ class MetricsCollector:
             'agent_quality_score',
             'Agent output quality score',
             ['agent_type'],
-            buckets=[0.0, 0.5, 0.7, 0.8, 0.9, 0.95, 1.0]
+            buckets=[0.0, 0.7, 0.8, 0.9, 1.0]
         )
+        
+        # Bound label children, cached per label-value tuple
+        self._request_children: Dict[Tuple[str, ...], Any] = {}
+        self._request_duration_children: Dict[Tuple[str, ...], Any] = {}
+        self._active_children: Dict[Tuple[str, ...], Any] = {}
+        self._error_children: Dict[Tuple[str, ...], Any] = {}
+        self._tool_children: Dict[Tuple[str, ...], Any] = {}
+        self._tool_duration_children: Dict[Tuple[str, ...], Any] = {}
+        self._quality_children: Dict[Tuple[str, ...], Any] = {}
+    
+    @staticmethod
+    def _get_child(
+        cache: Dict[Tuple[str, ...], Any],
+        metric: Any,
+        key: Tuple[str, ...]
+    ) -> Any:
+        """Get the labelled child for key, binding it on first use"""
+        child = cache.get(key)
+        if child is None:
+            child = metric.labels(*key)
+            cache[key] = child
+        return child
     
     def record_request(
         self,
-        agent_type: str,
+        agent_label: str,
         status: str,
         duration: float
     ):
         """Record agent request metrics"""
-        self.request_counter.labels(
-            agent_type=agent_type,
-            status=status
+        self._get_child(
+            self._request_children, self.request_counter, (agent_label, status)
         ).inc()
         
-        self.request_duration.labels(
-            agent_type=agent_type
+        self._get_child(
+            self._request_duration_children, self.request_duration, (agent_label,)
         ).observe(duration)
     
     def record_tool_call(
         self,
-        tool_name: str,
+        tool_label: str,
         status: str,
         duration: float
     ):
         """Record tool execution metrics"""
-        self.tool_calls.labels(
-            tool_name=tool_name,
-            status=status
+        self._get_child(
+            self._tool_children, self.tool_calls, (tool_label, status)
         ).inc()
         
-        self.tool_duration.labels(
-            tool_name=tool_name
+        self._get_child(
+            self._tool_duration_children, self.tool_duration, (tool_label,)
         ).observe(duration)
     
-    def record_error(self, agent_type: str, error_type: str):
+    def record_error(self, agent_label: str, error_type: str):
         """Record agent error"""
-        self.agent_errors.labels(
-            agent_type=agent_type,
-            error_type=error_type
+        if error_type not in self._KNOWN_ERRORS:
+            error_type = self.OTHER_LABEL
+        self._get_child(
+            self._error_children, self.agent_errors, (agent_label, error_type)
+        ).inc()
+    
+    def agent_started(self, agent_label: str):
+        """Count one more in-flight execution for the agent type"""
+        self._get_child(
+            self._active_children, self.active_agents, (agent_label,)
         ).inc()
     
-    def update_active_agents(self, agent_type: str, count: int):
-        """Update active agent count"""
-        self.active_agents.labels(agent_type=agent_type).set(count)
+    def agent_finished(self, agent_label: str):
+        """Count one fewer in-flight execution for the agent type"""
+        self._get_child(
+            self._active_children, self.active_agents, (agent_label,)
+        ).dec()
     
-    def record_quality_score(self, agent_type: str, score: float):
+    def record_quality_score(self, agent_label: str, score: float):
         """Record quality score"""
-        self.quality_score.labels(agent_type=agent_type).observe(score)
+        self._get_child(
+            self._quality_children, self.quality_score, (agent_label,)
+        ).observe(score)
 
 
 # ============================================================================
@@ -330,19 +414,22 @@ class AgentMonitor:
         session_id: str
     ):
         """Monitor agent execution with all observability features"""
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         
-        # Start logging context
-        self.logger.info(
+        # session_id stays in logs and traces; metric labels and span names
+        # only ever see registered agent types
+        agent_label = self.metrics.agent_label(agent_type)
+        
+        # Start logging context, bound once for every line of this execution
+        logger = self.logger.bind(agent_type=agent_type, session_id=session_id)
+        logger.info(
             "agent_execution_started",
-            agent_type=agent_type,
-            task=task[:100],  # Truncate long tasks
-            session_id=session_id
+            task=task[:100]  # Truncate long tasks
         )
         
         # Start tracing
         with self.tracing.start_span(
-            f"agent.{agent_type}.execute",
+            f"agent.{agent_label}.execute",
             attributes={
                 "agent.type": agent_type,
                 "session.id": session_id
@@ -350,35 +437,31 @@ class AgentMonitor:
         ) as span:
             try:
                 # Update active agents metric
-                self.metrics.update_active_agents(agent_type, 1)
+                self.metrics.agent_started(agent_label)
                 
                 yield {
                     "span": span,
-                    "logger": self.logger,
-                    "start_time": start_time
+                    "logger": logger,
+                    "start_ns": start_ns
                 }
                 
                 # Success metrics
-                duration = time.time() - start_time
-                self.metrics.record_request(agent_type, "success", duration)
+                duration = (time.monotonic_ns() - start_ns) / 1e9
+                self.metrics.record_request(agent_label, "success", duration)
                 
-                self.logger.info(
+                logger.info(
                     "agent_execution_completed",
-                    agent_type=agent_type,
-                    session_id=session_id,
                     duration=duration
                 )
                 
             except Exception as e:
                 # Error handling
-                duration = time.time() - start_time
-                self.metrics.record_request(agent_type, "error", duration)
-                self.metrics.record_error(agent_type, type(e).__name__)
+                duration = (time.monotonic_ns() - start_ns) / 1e9
+                self.metrics.record_request(agent_label, "error", duration)
+                self.metrics.record_error(agent_label, type(e).__name__)
                 
-                self.logger.error(
+                logger.error(
                     "agent_execution_failed",
-                    agent_type=agent_type,
-                    session_id=session_id,
                     error=str(e),
                     duration=duration,
                     exc_info=True
@@ -391,13 +474,12 @@ class AgentMonitor:
             
             finally:
                 # Update active agents
-                self.metrics.update_active_agents(agent_type, 0)
+                self.metrics.agent_finished(agent_label)
     
     def log_tool_execution(
         self,
         tool_name: str,
         parameters: Dict[str, Any],
-        result: Any,
         duration: float,
         success: bool
     ):
@@ -411,7 +493,7 @@ class AgentMonitor:
         )
         
         self.metrics.record_tool_call(
-            tool_name,
+            self.metrics.tool_label(tool_name),
             "success" if success else "error",
             duration
         )
@@ -442,7 +524,9 @@ class AgentMonitor:
             metrics=metrics
         )
         
-        self.metrics.record_quality_score(agent_type, quality_score)
+        self.metrics.record_quality_score(
+            self.metrics.agent_label(agent_type), quality_score
+        )
     
     def get_health_status(self) -> Dict[str, Any]:
         """Get system health status"""
@@ -485,6 +569,14 @@ def monitor_async(agent_type: str):
     return decorator
 
 
+def _summarize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep small scalars and reduce everything else to its type name"""
+    return {
+        key: value if isinstance(value, (int, float, bool)) else f"<{type(value).__name__}>"
+        for key, value in params.items()
+    }
+
+
 def monitor_tool(tool_name: str):
     """Decorator to monitor tool execution"""
     def decorator(func: Callable):
@@ -497,8 +589,7 @@ def monitor_tool(tool_name: str):
                 
                 agent_monitor.log_tool_execution(
                     tool_name=tool_name,
-                    parameters=kwargs,
-                    result=result,
+                    parameters=_summarize_params(kwargs),
                     duration=duration,
                     success=True
                 )
@@ -508,8 +599,7 @@ def monitor_tool(tool_name: str):
                 duration = time.time() - start_time
                 agent_monitor.log_tool_execution(
                     tool_name=tool_name,
-                    parameters=kwargs,
-                    result=None,
+                    parameters=_summarize_params(kwargs),
                     duration=duration,
                     success=False
                 )
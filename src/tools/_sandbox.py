@@ -0,0 +1,167 @@
+"""
+Code Execution Sandbox
+Warm worker processes that run snippets off the event loop. Kept free of
+app imports so that starting or replacing a worker stays cheap.
+"""
+import asyncio
+import io
+import multiprocessing
+from contextlib import redirect_stdout
+from typing import Optional, Set, Tuple
+
+
+MAX_OUTPUT = 64 * 1024
+
+# The fork server forks clean children instead of the (threaded) app process,
+# with only this module preloaded
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _ctx = multiprocessing.get_context("forkserver")
+    _ctx.set_forkserver_preload([__name__])
+else:
+    _ctx = multiprocessing.get_context("spawn")
+
+
+def _worker_main(conn) -> None:
+    """Worker loop: run each received snippet and send back (stdout, error)"""
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            return
+        
+        output = io.StringIO()
+        error = None
+        try:
+            with redirect_stdout(output):
+                exec(code, {"__builtins__": __builtins__})
+        except Exception as e:
+            error = str(e)
+        conn.send((output.getvalue()[:MAX_OUTPUT], error))
+
+
+class _Worker:
+    """One sandbox process and the parent's end of its pipe"""
+    
+    __slots__ = ("process", "conn")
+    
+    def __init__(self):
+        self.conn, child_conn = _ctx.Pipe()
+        self.process = _ctx.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+    
+    def kill(self) -> None:
+        """Kill the process and release the pipe (blocking)"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of warm sandbox processes
+    Workers start on first use. A worker whose snippet times out, is
+    cancelled or crashes is killed and replaced in the background, so a
+    runaway snippet never keeps a slot
+    """
+    
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: Set[_Worker] = set()
+        self._pending: Set[asyncio.Task] = set()
+        self._start_lock = asyncio.Lock()
+    
+    async def _spawn(self) -> _Worker:
+        """Start a worker without blocking the event loop"""
+        worker = await asyncio.get_running_loop().run_in_executor(None, _Worker)
+        self._workers.add(worker)
+        return worker
+    
+    async def _ensure_started(self) -> asyncio.Queue:
+        """Start the workers on first use"""
+        if self._idle is None:
+            async with self._start_lock:
+                if self._idle is None:
+                    idle = asyncio.Queue()
+                    for worker in await asyncio.gather(
+                        *(self._spawn() for _ in range(self.size))
+                    ):
+                        idle.put_nowait(worker)
+                    self._idle = idle
+        return self._idle
+    
+    async def _replace(self, worker: _Worker, idle: asyncio.Queue) -> None:
+        """Kill a worker and put a fresh one in its slot"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, worker.kill)
+        replacement = await self._spawn()
+        if self._idle is idle:
+            idle.put_nowait(replacement)
+        else:
+            # The pool was closed meanwhile
+            self._workers.discard(replacement)
+            await loop.run_in_executor(None, replacement.kill)
+    
+    def _retire(self, worker: _Worker, idle: asyncio.Queue) -> None:
+        """Replace a worker in the background"""
+        self._workers.discard(worker)
+        task = asyncio.ensure_future(self._replace(worker, idle))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    @staticmethod
+    async def _send(
+        worker: _Worker,
+        code: str,
+        timeout: float
+    ) -> Tuple[str, Optional[str]]:
+        """Send code to a worker and wait for its result"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = worker.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            worker.conn.send(code)
+            await asyncio.wait_for(ready, timeout=timeout)
+            return worker.conn.recv()
+        finally:
+            loop.remove_reader(fd)
+    
+    async def run(self, code: str, timeout: float) -> Tuple[str, Optional[str]]:
+        """
+        Run code on an idle worker and return (stdout, error)
+        Raises asyncio.TimeoutError if the snippet overruns
+        """
+        idle = await self._ensure_started()
+        worker = await idle.get()
+        try:
+            result = await self._send(worker, code, timeout)
+        except EOFError:
+            # Exited without sending a result (os._exit, crash)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, worker.process.join)
+            exitcode = worker.process.exitcode
+            self._retire(worker, idle)
+            return "", f"Process exited with code {exitcode}"
+        except BaseException:
+            self._retire(worker, idle)
+            raise
+        
+        idle.put_nowait(worker)
+        return result
+    
+    async def aclose(self) -> None:
+        """Kill all workers; the pool restarts on next use"""
+        self._idle = None
+        # Let in-flight replacements finish; they kill what they start
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        workers = list(self._workers)
+        self._workers.clear()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(None, worker.kill) for worker in workers)
+        )
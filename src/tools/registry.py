@@ -3,21 +3,59 @@ Tools Framework
 Implements MCP, Custom Tools, Built-in Tools, and OpenAPI Tools
 """
 import asyncio
+import copy
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Callable
+from collections import OrderedDict, deque
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Callable, Tuple
 from datetime import datetime
 import json
-import httpx
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
 
 from config.settings import get_settings
+from src.tools._sandbox import SandboxPool
+
+if TYPE_CHECKING:
+    import httpx
 
 
 settings = get_settings()
 
 
+# ============================================================================
+# LAZY IMPORTS - heavy modules load on first use, not at import time
+# ============================================================================
+
+_pandas = None
+_httpx = None
+
+
+def _get_pd():
+    """Import pandas on first use"""
+    global _pandas
+    if _pandas is None:
+        import pandas
+        _pandas = pandas
+    return _pandas
+
+
+def _get_httpx():
+    """Import httpx on first use"""
+    global _httpx
+    if _httpx is None:
+        import httpx
+        _httpx = httpx
+    return _httpx
+
+
 class ToolParameter(BaseModel):
     """Tool parameter definition"""
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     type: str
     description: str
@@ -27,6 +65,8 @@ class ToolParameter(BaseModel):
 
 class ToolDefinition(BaseModel):
     """Tool definition schema"""
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     description: str
     parameters: List[ToolParameter]
@@ -46,11 +86,17 @@ class ToolResult(BaseModel):
 class BaseTool(ABC):
     """Abstract base class for all tools"""
     
+    __slots__ = (
+        "name", "description", "execution_count", "total_execution_time",
+        "_definition"
+    )
+    
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
         self.execution_count = 0
         self.total_execution_time = 0.0
+        self._definition: Optional[ToolDefinition] = None
     
     @abstractmethod
     async def execute(self, **kwargs) -> ToolResult:
@@ -58,17 +104,32 @@ class BaseTool(ABC):
         pass
     
     @abstractmethod
+    def _build_definition(self) -> ToolDefinition:
+        """Build the tool definition"""
+        pass
+    
+    @property
+    def definition(self) -> ToolDefinition:
+        """Tool definition, built once; definitions are immutable"""
+        if self._definition is None:
+            self._definition = self._build_definition()
+        return self._definition
+    
     def get_definition(self) -> ToolDefinition:
         """Get tool definition"""
+        return self.definition
+    
+    async def aclose(self) -> None:
+        """Release resources held by the tool"""
         pass
     
     async def _track_execution(self, func: Callable, **kwargs) -> ToolResult:
         """Track tool execution metrics"""
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         try:
             result = await func(**kwargs)
             self.execution_count += 1
-            execution_time = (datetime.utcnow() - start_time).total_seconds()
+            execution_time = time.perf_counter() - start_time
             self.total_execution_time += execution_time
             
             if isinstance(result, ToolResult):
@@ -81,7 +142,7 @@ class BaseTool(ABC):
                 execution_time=execution_time
             )
         except Exception as e:
-            execution_time = (datetime.utcnow() - start_time).total_seconds()
+            execution_time = time.perf_counter() - start_time
             return ToolResult(
                 success=False,
                 error=str(e),
@@ -96,11 +157,53 @@ class BaseTool(ABC):
 class FMCGDataAnalysisTool(BaseTool):
     """Custom tool for FMCG data analysis"""
     
+    __slots__ = ("_df_cache", "_result_cache")
+    
+    DF_CACHE_SIZE = 4
+    SIDECAR_SUFFIX = ".fmcg-cache.parquet"
+    RESULT_CACHE_SIZE = 64
+    
     def __init__(self):
         super().__init__(
             name="fmcg_data_analysis",
             description="Analyze FMCG sales data with various metrics"
         )
+        # (path, mtime) -> parsed DataFrame, oldest first
+        self._df_cache: OrderedDict = OrderedDict()
+        # (path, mtime, analysis_type, filters) -> result, oldest first
+        self._result_cache: OrderedDict = OrderedDict()
+    
+    def _load_frame(self, data_path: str, mtime: float):
+        """Read a CSV, reusing the parsed frame while the file is unchanged"""
+        pd = _get_pd()
+        
+        key = (data_path, mtime)
+        df = self._df_cache.get(key)
+        if df is not None:
+            self._df_cache.move_to_end(key)
+            return df
+        
+        # A Parquet sidecar newer than the CSV decodes much faster than re-parsing.
+        # Its own suffix keeps it clear of any user file named <stem>.parquet
+        sidecar = Path(f"{data_path}{self.SIDECAR_SUFFIX}")
+        df = None
+        if sidecar.exists() and sidecar.stat().st_mtime >= mtime:
+            try:
+                df = pd.read_parquet(sidecar)
+            except (ImportError, OSError, ValueError):
+                df = None
+        
+        if df is None:
+            df = pd.read_csv(data_path)
+            try:
+                df.to_parquet(sidecar)
+            except (ImportError, OSError, ValueError):
+                pass  # Sidecar is best-effort (no pyarrow, read-only dir)
+        
+        self._df_cache[key] = df
+        if len(self._df_cache) > self.DF_CACHE_SIZE:
+            self._df_cache.popitem(last=False)
+        return df
     
     async def execute(
         self,
@@ -111,16 +214,31 @@ class FMCGDataAnalysisTool(BaseTool):
         """Execute FMCG data analysis"""
         
         async def _analyze():
-            # Simulate data analysis
-            import pandas as pd
-            
             try:
-                df = pd.read_csv(data_path)
+                mtime = os.path.getmtime(data_path)
+                try:
+                    result_key = (
+                        data_path, mtime, analysis_type,
+                        frozenset(filters.items()) if filters else frozenset()
+                    )
+                    cached = self._result_cache.get(result_key)
+                except TypeError:
+                    # Unhashable filter values are computed without memoization
+                    result_key = cached = None
+                if cached is not None:
+                    self._result_cache.move_to_end(result_key)
+                    return copy.deepcopy(cached)
+                
+                df = self._load_frame(data_path, mtime)
                 
                 if filters:
+                    # Combine all filters into one mask, then select once
+                    mask = np.ones(len(df), dtype=bool)
                     for key, value in filters.items():
                         if key in df.columns:
-                            df = df[df[key] == value]
+                            # NA in nullable dtypes counts as no match
+                            mask &= df[key].eq(value).to_numpy(dtype=bool, na_value=False)
+                    df = df[mask]
                 
                 if analysis_type == "sales_summary":
                     result = {
@@ -139,13 +257,19 @@ class FMCGDataAnalysisTool(BaseTool):
                 else:
                     result = {"message": "Unknown analysis type"}
                 
+                if result_key is not None:
+                    self._result_cache[result_key] = result
+                    if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                        self._result_cache.popitem(last=False)
+                    # Callers own their copy; nested values are not shared
+                    return copy.deepcopy(result)
                 return result
             except Exception as e:
                 raise Exception(f"Data analysis failed: {str(e)}")
         
         return await self._track_execution(_analyze)
     
-    def get_definition(self) -> ToolDefinition:
+    def _build_definition(self) -> ToolDefinition:
         return ToolDefinition(
             name=self.name,
             description=self.description,
@@ -176,6 +300,8 @@ class FMCGDataAnalysisTool(BaseTool):
 class InventoryCheckTool(BaseTool):
     """Custom tool for inventory checking"""
     
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(
             name="inventory_check",
@@ -204,7 +330,7 @@ class InventoryCheckTool(BaseTool):
         
         return await self._track_execution(_check)
     
-    def get_definition(self) -> ToolDefinition:
+    def _build_definition(self) -> ToolDefinition:
         return ToolDefinition(
             name=self.name,
             description=self.description,
@@ -232,6 +358,10 @@ class InventoryCheckTool(BaseTool):
 class GoogleSearchTool(BaseTool):
     """Built-in Google Search tool"""
     
+    __slots__ = ("api_key", "engine_id", "_base_params", "_client")
+    
+    SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+    
     def __init__(self):
         super().__init__(
             name="google_search",
@@ -239,6 +369,25 @@ class GoogleSearchTool(BaseTool):
         )
         self.api_key = settings.google_search_api_key
         self.engine_id = settings.google_search_engine_id
+        # Credentials never change, so the query-string prefix is built once
+        self._base_params = (("key", self.api_key), ("cx", self.engine_id))
+        self._client: Optional["httpx.AsyncClient"] = None
+    
+    async def _get_client(self) -> "httpx.AsyncClient":
+        """Lazily create the pooled HTTP client"""
+        if self._client is None:
+            httpx = _get_httpx()
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=10)
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def execute(
         self,
@@ -254,32 +403,26 @@ class GoogleSearchTool(BaseTool):
                     "message": "Google Search API not configured"
                 }
             
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                "key": self.api_key,
-                "cx": self.engine_id,
-                "q": query,
-                "num": num_results
-            }
+            params = self._base_params + (("q", query), ("num", str(num_results)))
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                results = []
-                for item in data.get("items", []):
-                    results.append({
-                        "title": item.get("title"),
-                        "link": item.get("link"),
-                        "snippet": item.get("snippet")
-                    })
-                
-                return {"results": results, "total": len(results)}
+            client = await self._get_client()
+            response = await client.get(self.SEARCH_URL, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            results = []
+            for item in data.get("items", []):
+                results.append({
+                    "title": item.get("title"),
+                    "link": item.get("link"),
+                    "snippet": item.get("snippet")
+                })
+            
+            return {"results": results, "total": len(results)}
         
         return await self._track_execution(_search)
     
-    def get_definition(self) -> ToolDefinition:
+    def _build_definition(self) -> ToolDefinition:
         return ToolDefinition(
             name=self.name,
             description=self.description,
@@ -301,15 +444,27 @@ class GoogleSearchTool(BaseTool):
         )
 
 
+MAX_CODE_WORKERS = 4
+
+# Warm sandbox processes shared by every CodeExecutionTool
+_sandbox = SandboxPool(MAX_CODE_WORKERS)
+
+
 class CodeExecutionTool(BaseTool):
     """Built-in code execution tool"""
     
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(
             name="code_execution",
             description="Execute Python code in a safe sandbox"
         )
     
+    async def aclose(self) -> None:
+        """Stop the sandbox workers"""
+        await _sandbox.aclose()
+    
     async def execute(
         self,
         code: str,
@@ -318,29 +473,30 @@ class CodeExecutionTool(BaseTool):
         """Execute code"""
         
         async def _execute():
-            # Simplified code execution (in production, use proper sandboxing)
-            import io
-            import sys
-            from contextlib import redirect_stdout
-            
-            output = io.StringIO()
+            # Process isolation only (in production, use proper sandboxing)
             try:
-                with redirect_stdout(output):
-                    exec(code, {"__builtins__": __builtins__})
+                output, error = await _sandbox.run(code, timeout)
+            except asyncio.TimeoutError:
                 return {
-                    "output": output.getvalue(),
-                    "status": "success"
+                    "output": "",
+                    "error": f"Execution timed out after {timeout}s",
+                    "status": "error"
                 }
-            except Exception as e:
+            
+            if error is not None:
                 return {
-                    "output": output.getvalue(),
-                    "error": str(e),
+                    "output": output,
+                    "error": error,
                     "status": "error"
                 }
+            return {
+                "output": output,
+                "status": "success"
+            }
         
         return await self._track_execution(_execute)
     
-    def get_definition(self) -> ToolDefinition:
+    def _build_definition(self) -> ToolDefinition:
         return ToolDefinition(
             name=self.name,
             description=self.description,
@@ -369,25 +525,23 @@ class CodeExecutionTool(BaseTool):
 class MCPTool(BaseTool):
     """MCP (Model Context Protocol) enhanced tool"""
     
+    __slots__ = ("mcp_config", "context_window")
+    
     def __init__(self, name: str, description: str, mcp_config: Dict[str, Any]):
         super().__init__(name, description)
         self.mcp_config = mcp_config
-        self.context_window = []
+        self.context_window = deque(maxlen=mcp_config.get("max_context", 10))
     
     async def execute(self, **kwargs) -> ToolResult:
         """Execute with MCP context enhancement"""
         
         async def _execute_with_context():
-            # Add current execution to context
+            # Add current execution to context; the deque evicts the oldest
             self.context_window.append({
                 "timestamp": datetime.utcnow().isoformat(),
                 "parameters": kwargs
             })
             
-            # Limit context window size
-            if len(self.context_window) > self.mcp_config.get("max_context", 10):
-                self.context_window.pop(0)
-            
             # Execute actual tool logic
             result = await self._execute_core(**kwargs)
             
@@ -410,11 +564,13 @@ class MCPTool(BaseTool):
         return {
             "total_calls": len(self.context_window),
             "recent_parameters": [
-                ctx["parameters"] for ctx in self.context_window[-3:]
+                ctx["parameters"] for ctx in islice(
+                    self.context_window, max(len(self.context_window) - 3, 0), None
+                )
             ]
         }
     
-    def get_definition(self) -> ToolDefinition:
+    def _build_definition(self) -> ToolDefinition:
         return ToolDefinition(
             name=self.name,
             description=f"{self.description} (MCP Enhanced)",
@@ -430,6 +586,8 @@ class MCPTool(BaseTool):
 class OpenAPITool(BaseTool):
     """Tool that interfaces with external APIs via OpenAPI spec"""
     
+    __slots__ = ("spec", "base_url", "_client")
+    
     def __init__(
         self,
         name: str,
@@ -439,6 +597,24 @@ class OpenAPITool(BaseTool):
         super().__init__(name, description)
         self.spec = openapi_spec
         self.base_url = openapi_spec.get("servers", [{}])[0].get("url", "")
+        self._client: Optional["httpx.AsyncClient"] = None
+    
+    async def _get_client(self) -> "httpx.AsyncClient":
+        """Lazily create the pooled HTTP client"""
+        if self._client is None:
+            httpx = _get_httpx()
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=10)
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def execute(
         self,
@@ -450,20 +626,20 @@ class OpenAPITool(BaseTool):
         """Execute API call"""
         
         async def _call_api():
-            async with httpx.AsyncClient() as client:
-                url = f"{self.base_url}{endpoint}"
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    json=data,
-                    headers=headers or {}
-                )
-                response.raise_for_status()
-                return response.json()
+            # The client resolves endpoint against base_url
+            client = await self._get_client()
+            response = await client.request(
+                method=method,
+                url=endpoint,
+                json=data,
+                headers=headers or {}
+            )
+            response.raise_for_status()
+            return response.json()
         
         return await self._track_execution(_call_api)
     
-    def get_definition(self) -> ToolDefinition:
+    def _build_definition(self) -> ToolDefinition:
         return ToolDefinition(
             name=self.name,
             description=self.description,
@@ -529,14 +705,19 @@ class ToolRegistry:
     
     async def execute(self, name: str, **kwargs) -> ToolResult:
         """Execute a tool by name"""
-        tool = self.get(name)
-        if not tool:
+        tool = self.tools.get(name)
+        if tool is None:
             return ToolResult(
                 success=False,
                 error=f"Tool '{name}' not found"
             )
         
         return await tool.execute(**kwargs)
+    
+    async def aclose(self) -> None:
+        """Release resources held by registered tools"""
+        for tool in self.tools.values():
+            await tool.aclose()
 
 
 # Global tool registry
@@ -0,0 +1,10 @@
+"""
+Shared test configuration
+Required settings get placeholder values so modules import without a .env
+"""
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ENABLE_TRACING", "false")
@@ -0,0 +1,48 @@
+"""Tests for the per-agent circuit breaker"""
+import asyncio
+
+import pytest
+
+from src.agents.coordinator import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+async def _fail():
+    raise ValueError("agent failed")
+
+
+async def _succeed():
+    return "ok"
+
+
+async def _hang():
+    await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_opens_after_threshold():
+    breaker = CircuitBreaker("analyst", failure_threshold=2, cooldown=60.0)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await breaker.call(_fail)
+    
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(_succeed)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_slot():
+    breaker = CircuitBreaker("analyst", failure_threshold=1, cooldown=0.0)
+    with pytest.raises(ValueError):
+        await breaker.call(_fail)
+    assert breaker.state == CircuitState.OPEN
+    
+    # The probe is cancelled by an outer timeout
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(breaker.call(_hang), timeout=0.05)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.half_open_probes == 0
+    
+    # The next call is admitted as a probe and closes the circuit
+    assert await breaker.call(_succeed) == "ok"
+    assert breaker.state == CircuitState.CLOSED
@@ -0,0 +1,28 @@
+"""Tests for context compaction and key-info extraction"""
+import pytest
+
+from src.memory.manager import ContextCompactor
+
+
+@pytest.mark.asyncio
+async def test_extract_key_info_keeps_alphanumeric_skus():
+    compactor = ContextCompactor()
+    context = [
+        {"role": "user", "content": "Restock SKU123 for FMCG2024 via the DC"},
+        {"role": "assistant", "content": "Sales of SKU123 rose; ask the CFO"},
+    ]
+    
+    info = await compactor.extract_key_info(context)
+    
+    assert set(info["entities"]) == {"SKU123", "FMCG2024", "CFO"}
+    assert info["message_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_extract_key_info_ignores_numbers_and_short_tokens():
+    compactor = ContextCompactor()
+    context = [{"role": "user", "content": "Order 2024 units of DC stock"}]
+    
+    info = await compactor.extract_key_info(context)
+    
+    assert info["entities"] == []
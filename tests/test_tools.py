@@ -0,0 +1,77 @@
+"""Tests for the tools framework"""
+import asyncio
+import os
+
+import pandas as pd
+import pytest
+
+from src.tools.registry import CodeExecutionTool, FMCGDataAnalysisTool
+
+
+@pytest.mark.asyncio
+async def test_filters_skip_na_in_nullable_columns(tmp_path):
+    data_path = tmp_path / "sales.csv"
+    data_path.write_text("region,sales\n")
+    
+    # Seed the parsed-frame cache with nullable dtypes containing NA
+    tool = FMCGDataAnalysisTool()
+    tool._df_cache[(str(data_path), os.path.getmtime(data_path))] = pd.DataFrame({
+        "region": pd.array(["north", None, "south", "north"], dtype="string"),
+        "units": pd.array([1, 2, None, 4], dtype="Int64"),
+        "sales": [10.0, 20.0, 30.0, 40.0],
+    })
+    
+    result = await tool.execute(
+        data_path=str(data_path),
+        filters={"region": "north", "units": 4}
+    )
+    
+    assert result.success, result.error
+    assert result.data["total_sales"] == 40.0
+    assert result.data["num_transactions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_parquet_sidecar_leaves_user_parquet_alone(tmp_path):
+    pytest.importorskip("pyarrow")
+    data_path = tmp_path / "sales.csv"
+    data_path.write_text("sales\n5.0\n7.0\n")
+    user_parquet = tmp_path / "sales.parquet"
+    pd.DataFrame({"sales": [1000.0]}).to_parquet(user_parquet)
+    
+    result = await FMCGDataAnalysisTool().execute(data_path=str(data_path))
+    
+    assert result.data["total_sales"] == 12.0
+    assert pd.read_parquet(user_parquet)["sales"].tolist() == [1000.0]
+    assert (tmp_path / "sales.csv.fmcg-cache.parquet").exists()
+    
+    # A fresh tool reads the sidecar, not the user's file
+    result = await FMCGDataAnalysisTool().execute(data_path=str(data_path))
+    assert result.data["total_sales"] == 12.0
+
+
+@pytest.mark.asyncio
+async def test_memoized_results_are_not_shared(tmp_path):
+    data_path = tmp_path / "sales.csv"
+    data_path.write_text("category,sales\nsnacks,5.0\ndrinks,7.0\n")
+    tool = FMCGDataAnalysisTool()
+    
+    first = await tool.execute(data_path=str(data_path), analysis_type="category_breakdown")
+    first.data["snacks"] = 0.0
+    
+    second = await tool.execute(data_path=str(data_path), analysis_type="category_breakdown")
+    assert second.data == {"drinks": 7.0, "snacks": 5.0}
+
+
+@pytest.mark.asyncio
+async def test_code_execution_recovers_after_timeouts():
+    tool = CodeExecutionTool()
+    
+    # More timed-out snippets than worker slots
+    results = await asyncio.gather(*(
+        tool.execute(code="while True: pass", timeout=1) for _ in range(5)
+    ))
+    assert all("timed out" in result.data["error"] for result in results)
+    
+    result = await tool.execute(code="print('ok')", timeout=10)
+    assert result.data == {"output": "ok\n", "status": "success"}